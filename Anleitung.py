@@ -1,8 +1,33 @@
 import streamlit as st
+import vorladen
+from datenmodell import DATA_FILE, activate_sqlite, get_store, sqlite_pfad
+
+def vorladen_anzeigen():
+    # Dateien im Hintergrund laden, damit die Datenseiten sofort bereit sind
+    lader = vorladen.starte()
+    lief = lader.laeuft()
+
+    @st.fragment(run_every=1 if lief else None)
+    def anzeige():
+        teile = []
+        for name, (status, info) in lader.uebersicht().items():
+            if status == vorladen.FERTIG:
+                teile.append(f"{name} bereit ({info:.1f}s)")
+            elif status == vorladen.FEHLER:
+                teile.append(f"{name}: Fehler – {info}")
+            else:
+                teile.append(f"{name} {status}")
+        st.caption(" Daten: " + " | ".join(teile))
+        # Einmal komplett neu laden, damit das Abfragen aufhört
+        if lief and not lader.laeuft():
+            st.rerun()
+
+    anzeige()
 
 def show_anleitung():
     st.set_page_config(page_title=" Anleitung: Excel Matching Umgebung", layout="wide")
     st.title(" Anleitung zur Excel-Matching-Umgebung")
+    vorladen_anzeigen()
 
     # Abschnitt: Setup
     st.markdown("## Setup")
@@ -37,11 +62,14 @@ C:/
     st.markdown("""
 - Lädt externe Excel-Dateien (beliebige Struktur)
 - Nutzt eine definierte Maske (aus `masken.json`) zur Filterung
+- Schlägt nach dem Hochladen die passendste Maske vor (Anteil gefundener Spalten in %)
 - Exportiert gefilterte Daten als neue Excel-Datei
 - Verwaltung der Masken über Tabs:
   - Neue Maske erstellen
   - Bestehende bearbeiten oder löschen
   - Import/Export von Masken im JSON-Format
+- Automatisch ohne Oberfläche: `python extraktion_daemon.py --maske <Name>` überwacht `Matching/Eingang`
+  und legt die gefilterten Dateien in `Matching/Ausgang` ab (bereits verarbeitete Dateien werden übersprungen)
 """)
 
     st.markdown("### 2. `Matching` –  Excel Topic Matcher")
@@ -50,6 +78,8 @@ C:/
 - Verknüpft Themen aus der Shortlist mit der Datei `Matching.xlsx`
 - Prüft bedingte Datenpunkte („Ja“ oder „Nein“)
 - Ergebnis: Gefilterte Excel-Datei mit passenden Topics zum Download
+- Viele Shortlists auf einmal ohne Oberfläche: `python batch_matching.py <Ordner> --ausgabe <Ordner>`
+  (oder `--kombiniert <Datei.xlsx>`, optional `--antworten <Datei>` mit den Spalten `Id` und `Antwort`)
 """)
 
     st.markdown("### 3. `Einträge erstellen` –  Daten manuell erfassen")
@@ -57,7 +87,7 @@ C:/
 - Enthält mehrere Tabs zur Pflege des Datenmodells:
   - **Regelwerk erstellen**: Neue Regelwerke anlegen
   - **Stakeholder hinzufügen**: Organisationen einpflegen
-  - **Datenpunkte hochladen**: Datenpunkte aus Excel importieren (mit Mapping)
+  - **Datenpunkte hochladen**: Datenpunkte aus Excel importieren (mit Mapping); vor dem Import wird eine Prüfung angezeigt, vorhandene Datenpunkte (gleicher Name, Gruppe und Datentyp) werden wiederverwendet
   - **Standorte hinzufügen**: Adresse und Zuordnung zu Stakeholdern
   - **Weitere Standards verknüpfen**: Paragrafen aus anderen Regelwerken übernehmen
   - **Kennzahl zuordnen**: Werte zu Datenpunkten und Stakeholdern hinzufügen
@@ -70,21 +100,29 @@ C:/
   - Regelwerk
   - Stakeholder
   - Gruppe
-- Zeigt bei Auswahl die zugehörigen **Kennzahlen**
+- Zeigt bei Auswahl die zugehörigen **Kennzahlen**, eingrenzbar auf einen Zeitraum, mit Verlauf je Stakeholder
+- Werte wie `1.234,5 t` oder `3,5 Mio. €` werden dafür als Zahl (Spalte „Zahl“) und Einheit gelesen; gespeichert bleibt der Text
 """)
 
     st.markdown("### 5. `Daten ändern` –  Entitäten direkt bearbeiten")
     st.markdown("""
 - Auswahl einer Entität (z. B. Stakeholder, Datenpunkt, Standort)
 - Bearbeitung direkt im Web-Grid
-- Änderungen werden sofort in `Datenmodell.xlsx` gespeichert
+- Änderungen werden sofort gespeichert und kurz danach in `Datenmodell.xlsx` übernommen
 """)
 
     st.markdown("### 6. `Daten löschen` –  Einträge entfernen")
     st.markdown("""
-- Auswahl eines Eintrags aus einer Entität
+- Auswahl eines oder mehrerer Einträge einer Entität, einzeln oder per Filter (z. B. alle Datenpunkte einer Gruppe, alle Kennzahlen vor 2020)
 - Löscht den Eintrag sowie verknüpfte Daten aus allen Tabellen
+- Abhängige Einträge werden über die Verknüpfungen ermittelt (z. B. Regelwerk → Paragrafen → Datenpunkte ohne weiteren Paragraf → Kennzahlen) und vor dem Löschen je Tabelle gezählt; wird nur ein Paragraf gelöscht, bleibt sein Datenpunkt erhalten
 - Achtung: Vorgang ist **nicht rückgängig** machbar
+""")
+
+    st.markdown("### 7. `Suche` –  Alle Tabellen durchsuchen")
+    st.markdown("""
+- Sucht einen oder mehrere Begriffe in allen Tabellen des Datenmodells gleichzeitig
+- Treffer werden je Tabelle gruppiert und nach Relevanz sortiert (exakter Zellwert vor Wortanfang vor Teilwort)
 """)
 
     st.markdown("---")
@@ -94,8 +132,40 @@ C:/
     st.markdown("""
 - Alle Dateien im `.xlsx`-Format
 - JSON-Dateien 
-- Excel-Dateien **dürfen beim Speichern nicht geöffnet sein**
+- Excel-Dateien **dürfen beim Speichern nicht geöffnet sein** (Änderungen am Datenmodell gehen nicht verloren, sie werden übernommen, sobald die Datei wieder geschlossen ist)
+""")
+
+    # Abschnitt: Speicher
+    st.markdown("##  Speicher des Datenmodells")
+    st.markdown("""
+Standardmäßig wird in `Datenmodell.xlsx` gespeichert: Jede Änderung landet zuerst in
+`C:/Matching/.Datenmodell.journal` und wird nach einigen Sekunden ohne weitere Änderungen in die Excel-Datei
+übernommen. Nach einem Absturz wird das Journal beim nächsten Start nachgeholt. Bei großen Datenmodellen kann stattdessen
+eine SQLite-Datenbank **`C:/Matching/Datenmodell.sqlite`** verwendet werden. Sobald diese Datei existiert,
+lesen und schreiben alle Seiten darüber; `Datenmodell.xlsx` dient dann nur noch als Import-/Exportformat.
+Neue IDs werden in beiden Fällen über `C:/Matching/.Datenmodell.ids.json` vergeben, damit gleichzeitige
+Nutzer nie dieselbe ID erhalten. Wird die Datei gelöscht, wird sie aus den höchsten vorhandenen IDs neu angelegt.
 """)
+    store = get_store(DATA_FILE)
+    try:
+        if store.backend.name == "SQLite":
+            st.info(f"Aktiver Speicher: SQLite (`{sqlite_pfad(DATA_FILE)}`)")
+            col1, col2 = st.columns(2)
+            if col1.button("Nach Datenmodell.xlsx exportieren"):
+                store.export_excel(DATA_FILE)
+                st.success(" Datenmodell.xlsx wurde aktualisiert.")
+            if col2.button("Datenmodell.xlsx erneut importieren"):
+                store.import_excel(DATA_FILE)
+                st.success(" Datenmodell.xlsx wurde in die Datenbank übernommen.")
+        else:
+            st.info("Aktiver Speicher: Excel (`Datenmodell.xlsx`)")
+            if st.button("SQLite-Speicher aktivieren"):
+                activate_sqlite(DATA_FILE)
+                st.success(" Datenmodell.xlsx wurde nach Datenmodell.sqlite importiert.")
+    except PermissionError:
+        st.error(" Zugriff verweigert: Die Datei ist derzeit geöffnet. Bitte schließe sie in Excel und versuche es erneut.")
+    except Exception as e:
+        st.error(f" Fehler beim Zugriff auf das Datenmodell: {e}")
 
     # Abschnitt: Hilfe
     st.markdown("##  Hilfe & Fehlerbehebung")
@@ -0,0 +1,155 @@
+"""Matching ohne Oberfläche für viele Shortlists auf einmal.
+
+Beispiel:
+    python batch_matching.py C:/Matching/Shortlists --ausgabe C:/Matching/Ergebnisse
+    python batch_matching.py C:/Matching/Shortlists --kombiniert C:/Matching/Ergebnis_alle.xlsx
+
+Bedingte Datenpunkte werden über die Spalte "Default" der Matching-Datei entschieden
+oder über eine Antwortdatei (--antworten, xlsx oder csv) mit den Spalten "Id" und
+"Antwort" (Ja/Nein) und optional "Datei", um Antworten auf eine Shortlist zu beschränken.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import pandas as pd
+
+from matching import MATCHING_DATEI, ShortlistError, load_rules, match_shortlist, read_shortlist
+
+_matching_df = None
+
+
+def _init_worker(matching_df):
+    # Die Regeldatei wird einmal im Hauptprozess gelesen und je Worker nur übergeben
+    global _matching_df
+    _matching_df = matching_df
+
+
+def lade_antworten(pfad):
+    if pfad.lower().endswith(".csv"):
+        df = pd.read_csv(pfad, dtype=str)
+    else:
+        df = pd.read_excel(pfad, dtype=str)
+    if not {"Id", "Antwort"}.issubset(df.columns):
+        raise ValueError("Die Antwortdatei muss die Spalten 'Id' und 'Antwort' enthalten.")
+    df = df.dropna(subset=["Id", "Antwort"])
+    df["Id"] = df["Id"].str.strip()
+    df["Antwort"] = df["Antwort"].str.strip().str.capitalize()
+    df = df[df["Antwort"].isin(["Ja", "Nein"])]
+    if "Datei" not in df.columns:
+        df["Datei"] = None
+    antworten = {}
+    for datei, gruppe in df.groupby(df["Datei"].fillna(""), sort=False):
+        antworten[datei] = dict(zip(gruppe["Id"], gruppe["Antwort"]))
+    return antworten
+
+
+def _antworten_fuer(antworten, datei):
+    # Allgemeine Antworten gelten für alle Dateien, dateispezifische haben Vorrang
+    result = dict(antworten.get("", {}))
+    result.update(antworten.get(datei, {}))
+    result.update(antworten.get(os.path.splitext(datei)[0], {}))
+    return result
+
+
+def verarbeite(pfad, antworten, ausgabe_ordner):
+    start = time.perf_counter()
+    shortlist_df = read_shortlist(pfad)
+    ergebnis = match_shortlist(_matching_df, shortlist_df, antworten)
+    zeilen = len(ergebnis)
+    if ausgabe_ordner:
+        name = os.path.splitext(os.path.basename(pfad))[0] + "_Ergebnis_Matching.xlsx"
+        with pd.ExcelWriter(os.path.join(ausgabe_ordner, name), engine="openpyxl") as writer:
+            ergebnis.to_excel(writer, index=False, sheet_name="Matched")
+        ergebnis = None
+    return ergebnis, zeilen, time.perf_counter() - start
+
+
+def _sheet_name(name, vergeben):
+    # Excel erlaubt höchstens 31 Zeichen und keine doppelten Namen
+    basis = name[:31]
+    kandidat, i = basis, 2
+    while kandidat in vergeben:
+        suffix = f"_{i}"
+        kandidat, i = basis[:31 - len(suffix)] + suffix, i + 1
+    vergeben.add(kandidat)
+    return kandidat
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Shortlists ohne Oberfläche gegen Matching.xlsx abgleichen.")
+    parser.add_argument("eingang", help="Ordner mit Shortlist-Dateien (.xlsx)")
+    parser.add_argument("--matching", default=MATCHING_DATEI, help="Pfad zur Matching-Datei")
+    ziel = parser.add_mutually_exclusive_group(required=True)
+    ziel.add_argument("--ausgabe", help="Ordner für eine Ergebnisdatei je Shortlist")
+    ziel.add_argument("--kombiniert", help="Eine Ergebnisdatei mit einem Blatt je Shortlist")
+    parser.add_argument("--antworten", help="Antwortdatei für bedingte Datenpunkte (Id, Antwort[, Datei])")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Anzahl paralleler Prozesse")
+    args = parser.parse_args(argv)
+
+    dateien = sorted(
+        os.path.join(args.eingang, f) for f in os.listdir(args.eingang)
+        if f.lower().endswith(".xlsx") and not f.startswith("~$")
+    )
+    if not dateien:
+        print("Keine Shortlist-Dateien gefunden.")
+        return 1
+
+    start = time.perf_counter()
+    matching_df, _ = load_rules(args.matching)
+    if "Topic" not in matching_df.columns:
+        print("Die Matching-Datei muss eine Spalte 'Topic' enthalten.")
+        return 1
+    antworten = lade_antworten(args.antworten) if args.antworten else {}
+    print(f"Matching-Datei geladen ({len(matching_df)} Regeln) in {time.perf_counter() - start:.2f}s")
+
+    if args.ausgabe:
+        os.makedirs(args.ausgabe, exist_ok=True)
+
+    aufgaben = [(pfad, _antworten_fuer(antworten, os.path.basename(pfad)), args.ausgabe) for pfad in dateien]
+    if args.workers > 1:
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(matching_df,)) as pool:
+            futures = [(aufgabe[0], pool.submit(verarbeite, *aufgabe)) for aufgabe in aufgaben]
+            fehler, ergebnisse = _sammle((pfad, future.result) for pfad, future in futures)
+    else:
+        _init_worker(matching_df)
+        fehler, ergebnisse = _sammle((aufgabe[0], partial(verarbeite, *aufgabe)) for aufgabe in aufgaben)
+
+    if args.kombiniert and ergebnisse:
+        vergeben = set()
+        with pd.ExcelWriter(args.kombiniert, engine="openpyxl") as writer:
+            for pfad, ergebnis in ergebnisse.items():
+                name = _sheet_name(os.path.splitext(os.path.basename(pfad))[0], vergeben)
+                ergebnis.to_excel(writer, index=False, sheet_name=name)
+        print(f"Kombinierte Ergebnisdatei geschrieben: {args.kombiniert}")
+
+    print(f"{len(dateien) - fehler} von {len(dateien)} Shortlists verarbeitet in {time.perf_counter() - start:.2f}s")
+    return 1 if fehler else 0
+
+
+def _sammle(laeufe):
+    fehler = 0
+    ergebnisse = {}
+    for pfad, ergebnis_holen in laeufe:
+        name = os.path.basename(pfad)
+        try:
+            ergebnis, zeilen, dauer = ergebnis_holen()
+        except ShortlistError as e:
+            fehler += 1
+            print(f"{name}: übersprungen – {e}")
+            continue
+        except Exception as e:
+            fehler += 1
+            print(f"{name}: Fehler – {e}")
+            continue
+        if ergebnis is not None:
+            ergebnisse[pfad] = ergebnis
+        print(f"{name}: {zeilen} Zeilen in {dauer:.2f}s")
+    return fehler, ergebnisse
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,1176 @@
+import datetime
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+DATA_FILE = "/Matching/Datenmodell.xlsx"
+
+# "excel" oder "sqlite"; leer = SQLite, sobald Datenmodell.sqlite neben der Excel-Datei liegt
+BACKEND = os.environ.get("DATENMODELL_BACKEND", "").strip().lower()
+
+PRIMAERSCHLUESSEL = {
+    "Regelwerk": ["Regelwerk-ID"],
+    "Stakeholder": ["Stakeholder-ID"],
+    "Datenpunkt": ["Datenpunkt-ID"],
+    "Paragraf": ["Paragraf-ID"],
+    "Standort": ["Standort-ID"],
+    "Kennzahl": ["Kennzahl-ID"],
+    "Regelwerk-Datenpunkt": ["Regelwerk-ID", "Datenpunkt-ID"],
+    "Stakeholder-Datenpunkt": ["Stakeholder-ID", "Datenpunkt-ID"],
+}
+
+# Fremdschlüssel (Kind-Sheet, Spalte, Eltern-Sheet): wird ein Elterneintrag gelöscht,
+# fallen alle Kindzeilen mit, die über die Spalte auf ihn verweisen
+FREMDSCHLUESSEL = [
+    ("Paragraf", "Regelwerk-ID", "Regelwerk"),
+    ("Paragraf", "Datenpunkt-ID", "Datenpunkt"),
+    ("Kennzahl", "Datenpunkt-ID", "Datenpunkt"),
+    ("Kennzahl", "Stakeholder-ID", "Stakeholder"),
+    ("Standort", "Stakeholder-ID", "Stakeholder"),
+    ("Regelwerk-Datenpunkt", "Regelwerk-ID", "Regelwerk"),
+    ("Regelwerk-Datenpunkt", "Datenpunkt-ID", "Datenpunkt"),
+    ("Stakeholder-Datenpunkt", "Stakeholder-ID", "Stakeholder"),
+    ("Stakeholder-Datenpunkt", "Datenpunkt-ID", "Datenpunkt"),
+]
+
+# Elterneinträge, die mit ihrer letzten Kindzeile verschwinden (Eltern-Sheet, Kind-Sheet, Spalte,
+# Sheets, von denen die Löschung ausgehen muss): ein Datenpunkt ohne Paragraf gehört zu keinem
+# Regelwerk mehr. Wer nur einen Paragraf löscht, behält den Datenpunkt.
+VERWAIST = [
+    ("Datenpunkt", "Paragraf", "Datenpunkt-ID", {"Regelwerk"}),
+]
+
+# Spalten, die neben den "-ID"-Spalten Zahlen enthalten; alles andere (auch "Wert") bleibt Text
+ZAHLENSPALTEN = {"Jahr"}
+
+
+class ConflictError(Exception):
+    """Zellen wurden seit dem Lesen von jemand anderem geändert.
+
+    konflikte enthält je Zelle (Schlüssel, Spalte, erwarteter Wert, aktueller Wert);
+    der aktuelle Wert ist None, wenn die Zeile nicht mehr existiert.
+    """
+
+    def __init__(self, konflikte):
+        self.konflikte = konflikte
+        super().__init__(f"{len(konflikte)} Änderung(en) passen nicht mehr zum gespeicherten Stand.")
+
+
+def primary_key(sheet_name, df):
+    # Schlüssel laut PRIMAERSCHLUESSEL, sonst die erste "-ID"-Spalte
+    pk = [c for c in PRIMAERSCHLUESSEL.get(sheet_name, []) if c in df.columns]
+    return pk or [c for c in df.columns if str(c).endswith("-ID")][:1]
+
+
+def _leer(wert):
+    return wert is None or (isinstance(wert, str) and wert == "") or (not isinstance(wert, str) and bool(pd.isna(wert)))
+
+
+def same_value(a, b):
+    # "" und NaN gelten als gleich, ebenso 5 und "5.0"
+    if _leer(a) or _leer(b):
+        return _leer(a) and _leer(b)
+    if a == b:
+        return True
+    try:
+        return float(a) == float(b)
+    except (TypeError, ValueError):
+        return str(a).strip() == str(b).strip()
+
+
+def diff_cells(alt, neu, keys):
+    """Vergleicht zwei gleich sortierte Fassungen derselben Zeilen.
+
+    Gibt [(Schlüssel, Spalte, alter Wert, neuer Wert)] für jede geänderte Zelle zurück;
+    die Schlüssel werden aus alt genommen.
+    """
+    if len(alt) != len(neu):
+        raise ValueError("Alte und neue Fassung haben unterschiedlich viele Zeilen.")
+    schluessel = list(zip(*(alt[k] for k in keys)))
+    aenderungen = []
+    for spalte in alt.columns:
+        if spalte in keys or spalte not in neu.columns:
+            continue
+        a = alt[spalte].to_numpy(dtype=object)
+        n = neu[spalte].to_numpy(dtype=object)
+        # Grob vektorisiert vorfiltern, dann nur die Kandidaten genau vergleichen
+        kandidaten = (pd.Series(a).astype(str) != pd.Series(n).astype(str)).to_numpy().nonzero()[0]
+        for i in kandidaten:
+            if not same_value(a[i], n[i]):
+                aenderungen.append((schluessel[i], spalte, a[i], n[i]))
+    return aenderungen
+
+
+def _zahlenspalte(spalte):
+    return str(spalte).endswith("-ID") or spalte in ZAHLENSPALTEN
+
+
+def _wert_fuer_spalte(serie, wert):
+    # Leere Eingaben als leere Zelle; nur Schlüssel- und Zahlenspalten laut Schema als Zahl speichern
+    if _leer(wert):
+        return np.nan
+    if _zahlenspalte(serie.name) and isinstance(wert, str):
+        try:
+            zahl = float(wert.strip().replace(",", "."))
+        except ValueError:
+            return wert
+        return int(zahl) if zahl.is_integer() else zahl
+    return wert
+
+
+def _schluessel_maske(frame, keys, schluessel):
+    # Zeilen, deren Schlüssel in schluessel (Tupel) vorkommt
+    if len(keys) > 1:
+        return pd.MultiIndex.from_frame(frame[keys]).isin(list(schluessel))
+    return frame[keys[0]].isin([s[0] for s in schluessel]).to_numpy()
+
+
+def _wende_zellen_an(name, frame, aenderungen):
+    """Prüft Zelländerungen gegen den aktuellen Stand und wendet sie auf eine Kopie an.
+
+    Gibt (neuer Frame, Delta) zurück; Delta hat die Schlüsselspalten plus "Spalte" und
+    "Wert" und wird vom Backend zeilenweise geschrieben.
+    """
+    keys = primary_key(name, frame)
+    if not keys:
+        raise ValueError(f"Sheet '{name}' hat keine Schlüsselspalte.")
+    vorhanden = _schluessel_maske(frame, keys, {schluessel for schluessel, _, _, _ in aenderungen})
+    zeilen = {}
+    for label, schluessel in zip(frame.index[vorhanden], frame.loc[vorhanden, keys].itertuples(index=False, name=None)):
+        zeilen.setdefault(schluessel, []).append(label)
+
+    konflikte = []
+    for schluessel, spalte, alt, neu in aenderungen:
+        labels = zeilen.get(tuple(schluessel))
+        if not labels or spalte not in frame.columns:
+            konflikte.append((schluessel, spalte, alt, None))
+            continue
+        for label in labels:
+            aktuell = frame.at[label, spalte]
+            if not same_value(aktuell, alt) and not same_value(aktuell, neu):
+                konflikte.append((schluessel, spalte, alt, aktuell))
+    if konflikte:
+        raise ConflictError(konflikte)
+
+    delta = pd.DataFrame(
+        [tuple(schluessel) + (spalte, _wert_fuer_spalte(frame[spalte], neu)) for schluessel, spalte, _, neu in aenderungen],
+        columns=keys + ["Spalte", "Wert"],
+    )
+    return _setze_zellen(frame, delta, zeilen), delta
+
+
+def _setze_zellen(frame, delta, zeilen=None):
+    # Wendet ein Delta (Schlüsselspalten, "Spalte", "Wert") ungeprüft auf eine Kopie an
+    keys = list(delta.columns[:-2])
+    schluessel = list(delta[keys].itertuples(index=False, name=None))
+    if zeilen is None:
+        vorhanden = _schluessel_maske(frame, keys, set(schluessel))
+        zeilen = {}
+        for label, k in zip(frame.index[vorhanden], frame.loc[vorhanden, keys].itertuples(index=False, name=None)):
+            zeilen.setdefault(k, []).append(label)
+    frame = frame.copy()
+    for k, spalte, wert in zip(schluessel, delta["Spalte"], delta["Wert"]):
+        labels = zeilen.get(k)
+        if not labels:
+            continue
+        try:
+            frame.loc[labels, spalte] = wert
+        except (TypeError, ValueError):
+            # Wert passt nicht zum Typ der Spalte (z. B. Text in einer Zahlenspalte)
+            frame[spalte] = frame[spalte].astype(object)
+            frame.loc[labels, spalte] = wert
+    return frame
+
+
+def _spiele_ein(frames, name, art, df):
+    # Übernimmt eine bereits geprüfte Änderung (wie vom Store ans Backend gegeben) in frames
+    frame = frames.get(name)
+    if art == "update":
+        frames[name] = _setze_zellen(frame, df)
+    elif art == "delete":
+        frames[name] = frame[~_schluessel_maske(frame, list(df.columns), set(df.itertuples(index=False, name=None)))]
+    elif art == "append" and frame is not None:
+        # Auch bei einem leeren Sheet anhängen, sonst gingen dessen Spalten verloren
+        frames[name] = pd.concat([frame, df], ignore_index=True)
+        if frame.empty:
+            frames[name] = frames[name].infer_objects()
+    else:
+        frames[name] = df
+
+
+def _entferne_zeilen(name, frame, schluessel):
+    # Gibt (Frame ohne die Zeilen, Delta mit den Schlüsseln der gelöschten Zeilen) zurück
+    keys = primary_key(name, frame)
+    if not keys:
+        raise ValueError(f"Sheet '{name}' hat keine Schlüsselspalte.")
+    return frame[~_schluessel_maske(frame, keys, schluessel)], pd.DataFrame(list(schluessel), columns=keys)
+
+
+class _RWLock:
+    # Mehrere Leser gleichzeitig, Schreiber exklusiv
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._leser = 0
+        self._schreiber = False
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._schreiber:
+                self._cond.wait()
+            self._leser += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._leser -= 1
+                if not self._leser:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            while self._schreiber or self._leser:
+                self._cond.wait()
+            self._schreiber = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._schreiber = False
+                self._cond.notify_all()
+
+
+def _datei_signatur(pfad):
+    stat = os.stat(pfad)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _bereinige_spalten(df):
+    df.columns = [c.strip() if isinstance(c, str) else c for c in df.columns]
+    return df
+
+
+def _uebernimm_dateirechte(tmp_pfad, pfad):
+    # mkstemp legt Dateien nur für den Besitzer lesbar an (0600); os.replace würde das auf pfad übertragen
+    try:
+        modus = os.stat(pfad).st_mode & 0o777
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        modus = 0o666 & ~umask
+    os.chmod(tmp_pfad, modus)
+
+
+def _schreibe_temp_workbook(pfad, frames):
+    # Schreibt frames in eine temporäre Datei neben pfad und gibt deren Pfad zurück
+    fd, tmp_pfad = tempfile.mkstemp(suffix=".xlsx", dir=os.path.dirname(pfad) or None)
+    os.close(fd)
+    try:
+        _uebernimm_dateirechte(tmp_pfad, pfad)
+        with pd.ExcelWriter(tmp_pfad, engine="openpyxl", mode="w") as writer:
+            for name, df in frames.items():
+                df.to_excel(writer, sheet_name=name, index=False)
+    except BaseException:
+        os.remove(tmp_pfad)
+        raise
+    return tmp_pfad
+
+
+def schreibe_workbook(pfad, frames):
+    # Erst in eine temporäre Datei schreiben, dann atomar ersetzen
+    tmp_pfad = _schreibe_temp_workbook(pfad, frames)
+    try:
+        os.replace(tmp_pfad, pfad)
+    except BaseException:
+        os.remove(tmp_pfad)
+        raise
+
+
+def _datei_hash(pfad):
+    h = hashlib.sha256()
+    with open(pfad, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class Snapshot:
+    """Binärer Abzug der Sheets neben der xlsx (z. B. /Matching/.Datenmodell.cache/).
+
+    Pro Sheet eine Pickle-Datei mit den Spalten-Arrays, dazu manifest.json mit
+    Hash, mtime und Größe der xlsx. Stimmen mtime und Größe nicht mehr, wird der
+    Hash verglichen; erst wenn auch der abweicht, gilt der Abzug als veraltet.
+    """
+
+    def __init__(self, excel_pfad):
+        ordner, datei = os.path.split(excel_pfad)
+        self.excel_pfad = excel_pfad
+        self.ordner = os.path.join(ordner, "." + os.path.splitext(datei)[0] + ".cache")
+        self.manifest_pfad = os.path.join(self.ordner, "manifest.json")
+
+    def _lade_manifest(self):
+        try:
+            with open(self.manifest_pfad, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def lade(self):
+        manifest = self._lade_manifest()
+        if manifest is None:
+            return None
+        mtime_ns, groesse = _datei_signatur(self.excel_pfad)
+        if (manifest["mtime_ns"], manifest["size"]) != (mtime_ns, groesse):
+            # z. B. nur "Speichern" in Excel ohne inhaltliche Änderung
+            if groesse != manifest["size"] or _datei_hash(self.excel_pfad) != manifest["sha256"]:
+                return None
+            manifest["mtime_ns"] = mtime_ns
+            self._schreibe_manifest(manifest)
+        try:
+            return {
+                name: pd.read_pickle(os.path.join(self.ordner, datei))
+                for name, datei in manifest["sheets"]
+            }
+        except Exception:
+            return None
+
+    def _schreibe_manifest(self, manifest):
+        tmp_pfad = self.manifest_pfad + ".tmp"
+        with open(tmp_pfad, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(tmp_pfad, self.manifest_pfad)
+
+    def schreibe(self, frames, geaendert=None):
+        # Ein fehlender Abzug kostet nur Ladezeit, daher Fehler hier nicht weiterreichen.
+        # Mit geaendert werden nur diese Sheets neu abgelegt, sofern die Sheet-Liste gleich blieb.
+        try:
+            os.makedirs(self.ordner, exist_ok=True)
+            mtime_ns, groesse = _datei_signatur(self.excel_pfad)
+            sha256 = _datei_hash(self.excel_pfad)
+            alt = self._lade_manifest()
+            if alt is None or [name for name, _ in alt["sheets"]] != list(frames):
+                geaendert = None
+            if os.path.exists(self.manifest_pfad):
+                os.remove(self.manifest_pfad)
+            sheets = []
+            for i, (name, df) in enumerate(frames.items()):
+                datei = f"{i}.pkl"
+                if geaendert is None or name in geaendert or not os.path.exists(os.path.join(self.ordner, datei)):
+                    df.to_pickle(os.path.join(self.ordner, datei))
+                sheets.append((name, datei))
+            self._schreibe_manifest({"sha256": sha256, "mtime_ns": mtime_ns, "size": groesse, "sheets": sheets})
+            for datei in os.listdir(self.ordner):
+                if datei.endswith(".pkl") and datei not in {d for _, d in sheets}:
+                    os.remove(os.path.join(self.ordner, datei))
+        except OSError:
+            pass
+
+
+class Journal:
+    """Append-only Protokoll der Schreibvorgänge neben der xlsx (z. B. /Matching/.Datenmodell.journal).
+
+    Ein Datensatz je Transaktion: Länge und CRC32 (je 4 Byte), dann die Änderungen
+    als Pickle. Ein beim Absturz nur halb geschriebener letzter Datensatz fällt beim
+    Lesen durch die Prüfsumme auf und wird abgeschnitten.
+    """
+
+    KOPF = struct.Struct("<II")
+
+    def __init__(self, pfad):
+        self.pfad = pfad
+
+    def anhaengen(self, aenderungen):
+        daten = pickle.dumps(aenderungen, protocol=pickle.HIGHEST_PROTOCOL)
+        with open(self.pfad, "ab") as f:
+            f.write(self.KOPF.pack(len(daten), zlib.crc32(daten)) + daten)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def lese(self):
+        """Alle vollständigen Datensätze; ein kaputtes Ende wird aus der Datei entfernt."""
+        try:
+            with open(self.pfad, "rb") as f:
+                inhalt = f.read()
+        except FileNotFoundError:
+            return []
+        saetze = []
+        pos = 0
+        while pos + self.KOPF.size <= len(inhalt):
+            laenge, crc = self.KOPF.unpack_from(inhalt, pos)
+            daten = inhalt[pos + self.KOPF.size:pos + self.KOPF.size + laenge]
+            if len(daten) < laenge or zlib.crc32(daten) != crc:
+                break
+            saetze.append(pickle.loads(daten))
+            pos += self.KOPF.size + laenge
+        if pos < len(inhalt):
+            with open(self.pfad, "r+b") as f:
+                f.truncate(pos)
+        return saetze
+
+    def uebernimm(self, anderes):
+        # Hängt die Datensätze eines anderen Journals an und entfernt es
+        with open(anderes.pfad, "rb") as quelle, open(self.pfad, "ab") as f:
+            f.write(quelle.read())
+            f.flush()
+            os.fsync(f.fileno())
+        os.remove(anderes.pfad)
+
+    def existiert(self):
+        return os.path.exists(self.pfad)
+
+
+def _entferne(pfad):
+    try:
+        os.remove(pfad)
+    except FileNotFoundError:
+        pass
+
+
+class ExcelBackend:
+    """Datenmodell in einer xlsx, Schreibvorgänge zuerst in ein Journal.
+
+    Jede Transaktion wird als kleiner Datensatz ans Journal gehängt (fsync) und ist
+    damit gespeichert. Ein Hintergrund-Thread schreibt den Gesamtstand in die xlsx,
+    sobald VERDICHTEN_NACH_SEKUNDEN lang nichts geschrieben wurde oder
+    VERDICHTEN_AB_SAETZEN Datensätze offen sind, und leert danach das Journal.
+    Beim Laden wird das Journal über die xlsx (bzw. den Snapshot) gespielt, ebenso
+    vor einer Verdichtung, wenn die xlsx inzwischen von außen geändert wurde. Ohne
+    Threads (stlite) wird wie bisher direkt nach jedem Schreiben verdichtet.
+    Es wird nur ein schreibender Prozess je Datei angenommen.
+    """
+
+    name = "Excel"
+
+    VERDICHTEN_NACH_SEKUNDEN = 5
+    VERDICHTEN_AB_SAETZEN = 50
+
+    def __init__(self, pfad):
+        self.pfad = pfad
+        self.snapshot = Snapshot(pfad)
+        ordner, datei = os.path.split(pfad)
+        basis = os.path.join(ordner, "." + os.path.splitext(datei)[0])
+        self.journal = Journal(basis + ".journal")
+        # Journal während einer Verdichtung; ziel enthält den Hash der xlsx, in der es bereits steckt
+        self._in_arbeit = Journal(basis + ".journal.verdichten")
+        self._ziel_pfad = basis + ".journal.ziel"
+        self._lock = threading.Condition()
+        self._verdichten_lock = threading.Lock()
+        self._stand = None
+        self._geaendert = set()
+        self._offen = 0
+        self._letzte = 0.0
+        self._thread = None
+        # Signatur: Zähler für fremde Änderungen an der xlsx und für eigene Schreibvorgänge.
+        # _datei ist die Datei, auf der _stand beruht, _gemeldet die zuletzt gemeldete fremde
+        self._datei = None
+        self._gemeldet = None
+        self._fremd = 0
+        self._eigene = 0
+
+    def signatur(self):
+        with self._lock:
+            datei = _datei_signatur(self.pfad)
+            if datei != self._datei and datei != self._gemeldet:
+                self._gemeldet = datei
+                self._fremd += 1
+            return (self._fremd, self._eigene)
+
+    def lade(self):
+        with self._verdichten_lock, self._lock:
+            frames, offen = self._lade()
+        if offen:
+            self._starte_verdichter()
+        return frames
+
+    def _lade(self):
+        # xlsx (bzw. Snapshot) plus Journal; der Aufrufer hält beide Sperren
+        frames = self.snapshot.lade()
+        if frames is None:
+            frames = pd.read_excel(self.pfad, sheet_name=None)
+            self.snapshot.schreibe(frames)
+        frames = {name: _bereinige_spalten(df) for name, df in frames.items()}
+        saetze = []
+        if self._in_arbeit.existiert():
+            # Abgebrochene Verdichtung: verwerfen nur, wenn die xlsx genau die dabei geschriebene ist
+            try:
+                with open(self._ziel_pfad, "r", encoding="utf-8") as f:
+                    ziel = f.read().strip()
+            except OSError:
+                ziel = None
+            if ziel and ziel == _datei_hash(self.pfad):
+                _entferne(self._in_arbeit.pfad)
+                _entferne(self._ziel_pfad)
+            else:
+                saetze = self._in_arbeit.lese()
+        saetze += self.journal.lese()
+        self._geaendert = set()
+        for aenderungen in saetze:
+            for name, art, df in aenderungen:
+                _spiele_ein(frames, name, art, df)
+                self._geaendert.add(name)
+        self._stand = frames
+        self._offen = len(saetze)
+        self._datei = _datei_signatur(self.pfad)
+        return frames, len(saetze)
+
+    def schreibe(self, frames, aenderungen):
+        # Nur die Änderungen ins Journal; die xlsx wird im Hintergrund geschrieben
+        with self._lock:
+            self.journal.anhaengen(aenderungen)
+            # Auf den eigenen Stand anwenden statt frames zu übernehmen: hat der Verdichter
+            # inzwischen eine von außen geänderte xlsx geladen, wäre frames veraltet
+            if self._stand is None:
+                self._stand = frames
+            else:
+                stand = dict(self._stand)
+                for name, art, df in aenderungen:
+                    _spiele_ein(stand, name, art, df)
+                self._stand = stand
+            self._geaendert.update(name for name, _, _ in aenderungen)
+            self._offen += 1
+            self._eigene += 1
+            self._letzte = time.monotonic()
+            self._lock.notify_all()
+        self._starte_verdichter()
+
+    def _starte_verdichter(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._verdichter, name="verdichten", daemon=True)
+        try:
+            self._thread.start()
+        except RuntimeError:
+            # Ohne Threads (stlite/Pyodide) sofort verdichten, wie früher beim Schreiben
+            with self._lock:
+                self._thread = None
+            try:
+                self.verdichte()
+            except Exception:
+                # Die Änderung steht im Journal; beim nächsten Schreiben erneut versuchen
+                pass
+
+    def _verdichter(self):
+        while True:
+            with self._lock:
+                while True:
+                    if self._offen >= self.VERDICHTEN_AB_SAETZEN:
+                        break
+                    if self._offen:
+                        rest = self._letzte + self.VERDICHTEN_NACH_SEKUNDEN - time.monotonic()
+                        if rest <= 0:
+                            break
+                        self._lock.wait(rest)
+                    else:
+                        self._lock.wait()
+            try:
+                self.verdichte()
+            except Exception:
+                # z. B. xlsx in Excel geöffnet; das Journal bleibt gültig, später erneut versuchen
+                with self._lock:
+                    self._letzte = time.monotonic()
+
+    def verdichte(self):
+        """Schreibt den aktuellen Stand in die xlsx und leert das Journal."""
+        with self._verdichten_lock:
+            with self._lock:
+                if not self._offen:
+                    return
+                if _datei_signatur(self.pfad) != self._datei:
+                    # Von außen geändert (z. B. in Excel gespeichert): das Journal über die neue
+                    # Datei spielen statt sie mit dem alten Stand zu überschreiben; der Store lädt neu
+                    self._lade()
+                    self._fremd += 1
+                frames, geaendert, offen, datei = self._stand, self._geaendert, self._offen, self._datei
+                # Ab hier gehen neue Datensätze in ein frisches Journal
+                if self.journal.existiert() and self._in_arbeit.existiert():
+                    self._in_arbeit.uebernimm(self.journal)
+                elif self.journal.existiert():
+                    os.replace(self.journal.pfad, self._in_arbeit.pfad)
+                self._geaendert, self._offen = set(), 0
+            try:
+                tmp_pfad = _schreibe_temp_workbook(self.pfad, frames)
+                try:
+                    with open(self._ziel_pfad, "w", encoding="utf-8") as f:
+                        f.write(_datei_hash(tmp_pfad))
+                        f.flush()
+                        os.fsync(f.fileno())
+                    with self._lock:
+                        if _datei_signatur(self.pfad) != datei:
+                            raise RuntimeError(f"{self.pfad} wurde während der Verdichtung geändert.")
+                        os.replace(tmp_pfad, self.pfad)
+                        # Sofort aufräumen: einmal in der xlsx, dürfen die Datensätze nie wieder eingespielt werden
+                        _entferne(self._in_arbeit.pfad)
+                        _entferne(self._ziel_pfad)
+                        self._datei = _datei_signatur(self.pfad)
+                except BaseException:
+                    _entferne(tmp_pfad)
+                    raise
+            except BaseException:
+                with self._lock:
+                    self._geaendert |= geaendert
+                    self._offen += offen
+                raise
+            self.snapshot.schreibe(frames, geaendert)
+
+
+def _q(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _sql_wert(wert):
+    if wert is None:
+        return None
+    if isinstance(wert, np.generic):
+        wert = wert.item()
+    if isinstance(wert, float) and np.isnan(wert):
+        return None
+    if wert is pd.NaT or wert is pd.NA:
+        return None
+    if isinstance(wert, (datetime.date, datetime.time)):
+        return wert.isoformat()
+    return wert
+
+
+class SqliteBackend:
+    """Speichert das Datenmodell in einer SQLite-Datenbank (WAL, echte Schlüssel).
+
+    Jedes Sheet wird eine Tabelle; die Reihenfolge der Sheets steht in _blaetter.
+    Existiert die Datenbank noch nicht, wird sie aus der Excel-Datei importiert.
+    """
+
+    name = "SQLite"
+
+    def __init__(self, pfad, excel_pfad=None):
+        self.pfad = pfad
+        if not os.path.exists(pfad):
+            frames = pd.read_excel(excel_pfad, sheet_name=None) if excel_pfad and os.path.exists(excel_pfad) else {}
+            self._initialisiere()
+            aenderungen = [(name, "replace", _bereinige_spalten(df)) for name, df in frames.items()]
+            self.schreibe(None, aenderungen)
+
+    def _verbinde(self):
+        # Transaktionen werden in schreibe() explizit gesteuert
+        con = sqlite3.connect(self.pfad, timeout=30, isolation_level=None)
+        con.execute("PRAGMA synchronous=NORMAL")
+        return con
+
+    def _initialisiere(self):
+        con = self._verbinde()
+        try:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("CREATE TABLE IF NOT EXISTS _blaetter (name TEXT PRIMARY KEY, pos INTEGER)")
+        finally:
+            con.close()
+
+    def signatur(self):
+        con = self._verbinde()
+        try:
+            return con.execute("PRAGMA user_version").fetchone()[0]
+        finally:
+            con.close()
+
+    def lade(self):
+        con = self._verbinde()
+        try:
+            namen = [r[0] for r in con.execute("SELECT name FROM _blaetter ORDER BY pos")]
+            return {name: pd.read_sql_query(f"SELECT * FROM {_q(name)}", con) for name in namen}
+        finally:
+            con.close()
+
+    def _spalten(self, con, tabelle):
+        return [r[1] for r in con.execute(f"PRAGMA table_info({_q(tabelle)})")]
+
+    def _erstelle_tabelle(self, con, tabelle, spalten):
+        pk = [c for c in PRIMAERSCHLUESSEL.get(tabelle, []) if c in spalten]
+        defs = [f"{_q(c)} INTEGER" if str(c).endswith("-ID") else _q(c) for c in spalten]
+        if pk:
+            defs.append(f"PRIMARY KEY ({', '.join(_q(c) for c in pk)})")
+        con.execute(f"CREATE TABLE {_q(tabelle)} ({', '.join(defs)})")
+        # Indizes auf alle Fremdschlüssel, die nicht vorne im Primärschlüssel stehen
+        for c in spalten:
+            if str(c).endswith("-ID") and pk[:1] != [c]:
+                con.execute(f"CREATE INDEX {_q(f'ix_{tabelle}_{c}')} ON {_q(tabelle)} ({_q(c)})")
+        pos = con.execute("SELECT COALESCE(MAX(pos), 0) + 1 FROM _blaetter").fetchone()[0]
+        con.execute("INSERT OR IGNORE INTO _blaetter (name, pos) VALUES (?, ?)", (tabelle, pos))
+
+    def _einfuegen(self, con, tabelle, df):
+        if df.empty:
+            return
+        spalten = self._spalten(con, tabelle)
+        for c in df.columns:
+            if c not in spalten:
+                con.execute(f"ALTER TABLE {_q(tabelle)} ADD COLUMN {_q(c)}")
+        # Verknüpfungstabellen bestehen nur aus dem Schlüssel: Dubletten ignorieren
+        oder = " OR IGNORE" if set(PRIMAERSCHLUESSEL.get(tabelle, [])) >= set(df.columns) else ""
+        platzhalter = ", ".join("?" for _ in df.columns)
+        con.executemany(
+            f"INSERT{oder} INTO {_q(tabelle)} ({', '.join(_q(c) for c in df.columns)}) VALUES ({platzhalter})",
+            ([_sql_wert(v) for v in zeile] for zeile in df.astype(object).itertuples(index=False, name=None)),
+        )
+
+    def _aktualisiere_zellen(self, con, tabelle, delta):
+        # Nur die geänderten Zeilen anfassen, eine UPDATE-Anweisung je Spalte
+        keys = [c for c in delta.columns if c not in ("Spalte", "Wert")]
+        bedingung = " AND ".join(f"{_q(k)} = ?" for k in keys)
+        for spalte, gruppe in delta.groupby("Spalte", sort=False):
+            con.executemany(
+                f"UPDATE {_q(tabelle)} SET {_q(spalte)} = ? WHERE {bedingung}",
+                ([_sql_wert(zeile[-1])] + [_sql_wert(v) for v in zeile[:-1]]
+                 for zeile in gruppe[keys + ["Wert"]].astype(object).itertuples(index=False, name=None)),
+            )
+
+    def _loesche_zeilen(self, con, tabelle, delta):
+        # IS statt =, damit auch leere Schlüsselzellen passen
+        bedingung = " AND ".join(f"{_q(k)} IS ?" for k in delta.columns)
+        con.executemany(
+            f"DELETE FROM {_q(tabelle)} WHERE {bedingung}",
+            ([_sql_wert(v) for v in zeile] for zeile in delta.astype(object).itertuples(index=False, name=None)),
+        )
+
+    def schreibe(self, frames, aenderungen):
+        con = self._verbinde()
+        try:
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                for tabelle, art, df in aenderungen:
+                    spalten = self._spalten(con, tabelle)
+                    if art == "update":
+                        self._aktualisiere_zellen(con, tabelle, df)
+                        continue
+                    if art == "delete":
+                        self._loesche_zeilen(con, tabelle, df)
+                        continue
+                    if art == "replace" and spalten and spalten != list(df.columns):
+                        # Spalten haben sich geändert: Tabelle neu anlegen, Position behalten
+                        pos = con.execute("SELECT pos FROM _blaetter WHERE name = ?", (tabelle,)).fetchone()
+                        con.execute(f"DROP TABLE {_q(tabelle)}")
+                        con.execute("DELETE FROM _blaetter WHERE name = ?", (tabelle,))
+                        self._erstelle_tabelle(con, tabelle, list(df.columns))
+                        if pos:
+                            con.execute("UPDATE _blaetter SET pos = ? WHERE name = ?", (pos[0], tabelle))
+                    elif not spalten:
+                        self._erstelle_tabelle(con, tabelle, list(df.columns))
+                    elif art == "replace":
+                        con.execute(f"DELETE FROM {_q(tabelle)}")
+                    self._einfuegen(con, tabelle, df)
+                version = con.execute("PRAGMA user_version").fetchone()[0]
+                con.execute(f"PRAGMA user_version = {version + 1}")
+            except BaseException:
+                con.execute("ROLLBACK")
+                raise
+            con.execute("COMMIT")
+        finally:
+            con.close()
+
+
+def _sperre_versuchen(f):
+    if fcntl is not None:
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        return True
+    if msvcrt is not None:
+        f.seek(0)
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            return False
+        return True
+    # Pyodide: ein Prozess ohne Threads
+    return True
+
+
+def _sperre_freigeben(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    elif msvcrt is not None:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def _dateisperre(pfad, timeout=10):
+    # Sperre über mehrere Prozesse und Threads: Betriebssystem-Lock auf der Sperrdatei.
+    # Das System gibt ihn frei, wenn der Prozess endet, veraltete Sperren gibt es also
+    # nicht; die Datei selbst bleibt liegen, sonst könnten zwei Prozesse verschiedene
+    # Dateien gleichen Namens sperren.
+    start = time.monotonic()
+    with open(pfad, "a+b") as f:
+        while not _sperre_versuchen(f):
+            if time.monotonic() - start > timeout:
+                raise TimeoutError(f"Sperre {pfad} wird seit {timeout}s gehalten.")
+            time.sleep(0.01)
+        try:
+            yield
+        finally:
+            _sperre_freigeben(f)
+
+
+class IdSequenz:
+    """Nächste freie ID je Sheet in einer kleinen JSON-Datei neben dem Datenmodell.
+
+    Reservierungen laufen unter einer Dateisperre, zwei Sessions oder Prozesse
+    bekommen also nie dieselbe ID. Ein Import kann mit einem Aufruf einen ganzen
+    Bereich reservieren.
+    """
+
+    def __init__(self, modell_pfad):
+        ordner, datei = os.path.split(modell_pfad)
+        basis = os.path.join(ordner, "." + os.path.splitext(datei)[0])
+        self.pfad = basis + ".ids.json"
+        self.sperre = basis + ".ids.lock"
+
+    def _lese(self):
+        try:
+            with open(self.pfad, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _schreibe(self, stand):
+        tmp_pfad = self.pfad + ".tmp"
+        with open(tmp_pfad, "w", encoding="utf-8") as f:
+            json.dump(stand, f, ensure_ascii=False)
+        os.replace(tmp_pfad, self.pfad)
+
+    def reserviere(self, name, anzahl, untergrenze, pruefen=False):
+        """Gibt die erste von anzahl fortlaufenden IDs zurück; anzahl 0 reserviert nichts.
+
+        untergrenze() liefert die kleinste erlaubte ID aus den Daten und wird nur
+        aufgerufen, wenn es noch keine Folge gibt oder pruefen gesetzt ist.
+        """
+        with _dateisperre(self.sperre):
+            stand = self._lese()
+            naechste = stand.get(name)
+            if naechste is None or pruefen:
+                naechste = max(naechste or 1, untergrenze())
+            if anzahl or stand.get(name) != naechste:
+                stand[name] = naechste + anzahl
+                self._schreibe(stand)
+        return naechste
+
+
+class ModelStore:
+    """Prozessweiter Cache des Datenmodells, den alle Seiten und Sessions teilen.
+
+    Die Sheets werden einmal aus dem Backend geladen und erst neu gelesen, wenn
+    sich dessen Signatur ändert (bei Excel eine fremde Änderung der Datei) oder ein
+    eigener Schreibvorgang abgeschlossen wurde. Herausgegebene DataFrames sind
+    Kopien und dürfen frei verändert werden.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = _RWLock()
+        self._signatur = None
+        self._frames = None
+        self.version = 0
+        # Stand je Sheet, damit abgeleitete Strukturen (z. B. Suchindex) nur geänderte Sheets neu bauen
+        self._sheet_versionen = {}
+        self._verweise = {}
+        self._verweise_lock = threading.Lock()
+        self.ids = IdSequenz(backend.pfad)
+        # Stand des letzten Ladens aus dem Backend und je Sheet der Stand, gegen den die ID-Folge geprüft wurde
+        self._geladen = None
+        self._ids_geprueft = {}
+
+    def _aktualisieren(self):
+        signatur = self.backend.signatur()
+        with self._lock.read():
+            if self._frames is not None and signatur == self._signatur:
+                return
+        with self._lock.write():
+            # Ein anderer Thread hat eventuell schon neu geladen
+            if self._frames is not None and signatur == self._signatur:
+                return
+            self._neu_laden(signatur)
+
+    def _neu_laden(self, signatur):
+        # Nur mit Schreibsperre aufrufen
+        frames = self.backend.lade()
+        self._frames = {name: _bereinige_spalten(df) for name, df in frames.items()}
+        self._signatur = signatur
+        self.version += 1
+        self._sheet_versionen = dict.fromkeys(self._frames, self.version)
+        self._geladen = self.version
+
+    def sheet_names(self):
+        self._aktualisieren()
+        with self._lock.read():
+            return list(self._frames)
+
+    def sheet(self, name, default=None):
+        self._aktualisieren()
+        with self._lock.read():
+            df = self._frames.get(name)
+            if df is None:
+                return pd.DataFrame() if default is None else default
+            return df.copy()
+
+    def sheet_readonly(self, name):
+        """(Version des Sheets, DataFrame) ohne Kopie; der DataFrame darf nicht verändert werden."""
+        self._aktualisieren()
+        with self._lock.read():
+            return self._sheet_versionen.get(name, 0), self._frames.get(name, pd.DataFrame())
+
+    def rueckverweise(self, name, spalte):
+        """{ID: Zeilenpositionen} einer Spalte; wird je Stand des Sheets einmal aufgebaut."""
+        version, df = self.sheet_readonly(name)
+        with self._verweise_lock:
+            eintrag = self._verweise.get((name, spalte))
+            if eintrag is None or eintrag[0] != version:
+                index = {}
+                if spalte in df.columns:
+                    index = pd.Series(np.arange(len(df))).groupby(_id_werte(df[spalte]).to_numpy(), sort=False).indices
+                eintrag = self._verweise[(name, spalte)] = (version, index)
+            return eintrag[1]
+
+    def _hoechste_id(self, name, spalte):
+        _, df = self.sheet_readonly(name)
+        if spalte not in df.columns:
+            return 0
+        hoechste = pd.to_numeric(df[spalte], errors="coerce").max()
+        return 0 if pd.isna(hoechste) else int(hoechste)
+
+    def reserviere_ids(self, name, anzahl=1):
+        """Reserviert anzahl fortlaufende IDs für das Sheet und gibt die erste zurück.
+
+        Gegen die Daten wird nur geprüft, wenn das Sheet seit der letzten Prüfung
+        von außen neu geladen wurde (z. B. nach einer Änderung in Excel) oder
+        Zeilen anders als per Zelländerung geschrieben wurden (z. B. Import).
+        """
+        self._aktualisieren()
+        spalte = PRIMAERSCHLUESSEL.get(name, [f"{name}-ID"])[0]
+        geladen = self._geladen
+        erste = self.ids.reserviere(name, anzahl, lambda: self._hoechste_id(name, spalte) + 1,
+                                    pruefen=self._ids_geprueft.get(name) != geladen)
+        self._ids_geprueft[name] = geladen
+        return erste
+
+    def load(self):
+        self._aktualisieren()
+        with self._lock.read():
+            return {name: df.copy() for name, df in self._frames.items()}
+
+    def save(self, sheets):
+        with self.transaction() as tx:
+            for name, df in sheets.items():
+                tx.replace(name, df)
+
+    def transaction(self):
+        return Transaction(self)
+
+    def import_excel(self, pfad):
+        with self.transaction() as tx:
+            for name, df in pd.read_excel(pfad, sheet_name=None).items():
+                tx.replace(name, df)
+
+    def export_excel(self, pfad):
+        schreibe_workbook(pfad, self.load())
+
+    def _commit(self, aenderungen):
+        self._aktualisieren()
+        with self._lock.write():
+            # Zwischen _aktualisieren und der Sperre kann sich das Backend geändert haben
+            signatur = self.backend.signatur()
+            if self._frames is None or signatur != self._signatur:
+                self._neu_laden(signatur)
+            frames = dict(self._frames)
+            geschrieben = []
+            for name, art, df in aenderungen:
+                if art == "update":
+                    # df ist hier die Liste der Zelländerungen; das Backend bekommt nur das Delta
+                    frames[name], df = _wende_zellen_an(name, frames.get(name, pd.DataFrame()), df)
+                elif art == "delete":
+                    frames[name], df = _entferne_zeilen(name, frames.get(name, pd.DataFrame()), df)
+                else:
+                    _spiele_ein(frames, name, art, df)
+                geschrieben.append((name, art, df))
+            self.backend.schreibe(frames, geschrieben)
+            self._frames = frames
+            self._signatur = self.backend.signatur()
+            self.version += 1
+            for name, art, _ in geschrieben:
+                self._sheet_versionen[name] = self.version
+                if art != "update":
+                    # Neue oder ersetzte Zeilen können IDs über der ID-Folge mitbringen (z. B. Import)
+                    self._ids_geprueft.pop(name, None)
+
+    def invalidate(self):
+        with self._lock.write():
+            self._frames = None
+            self._signatur = None
+
+
+class Transaction:
+    """Sammelt Änderungen an mehreren Sheets und schreibt sie in einem Durchgang.
+
+    Als Kontextmanager wird beim Verlassen ohne Fehler automatisch committet.
+    """
+
+    def __init__(self, store):
+        self._store = store
+        self._aenderungen = []
+
+    def replace(self, sheet_name, df):
+        self._aenderungen.append((sheet_name, "replace", _bereinige_spalten(df.copy())))
+
+    def append(self, sheet_name, rows):
+        # Zeilen werden erst beim Commit an den dann aktuellen Stand angehängt
+        rows = pd.DataFrame(rows)
+        if not rows.empty:
+            self._aenderungen.append((sheet_name, "append", _bereinige_spalten(rows)))
+
+    def update(self, sheet_name, aenderungen):
+        """Zelländerungen [(Schlüssel, Spalte, alter Wert, neuer Wert)].
+
+        Beim Commit wird jeder alte Wert mit dem gespeicherten Stand verglichen; hat
+        jemand die Zelle inzwischen anders geändert, schlägt der Commit mit
+        ConflictError fehl und es wird nichts geschrieben.
+        """
+        aenderungen = [(tuple(schluessel), spalte, alt, neu) for schluessel, spalte, alt, neu in aenderungen]
+        if aenderungen:
+            self._aenderungen.append((sheet_name, "update", aenderungen))
+
+    def delete(self, sheet_name, schluessel):
+        # Löscht alle Zeilen mit diesen Schlüsseln (Tupel wie bei update); das Backend bekommt nur die Schlüssel
+        schluessel = {tuple(s) for s in schluessel}
+        if schluessel:
+            self._aenderungen.append((sheet_name, "delete", schluessel))
+
+    def commit(self):
+        if self._aenderungen:
+            self._store._commit(self._aenderungen)
+        self._aenderungen = []
+
+    def rollback(self):
+        self._aenderungen = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+
+
+def _id_werte(serie):
+    # 5, 5.0 und "5" sind dieselbe ID
+    zahlen = pd.to_numeric(serie, errors="coerce")
+    return serie.astype(object).where(zahlen.isna(), zahlen)
+
+
+def _ids(df, spalte, positionen):
+    return set(_id_werte(df[spalte].iloc[positionen]).dropna())
+
+
+def loeschplan(store, auswahl):
+    """Alle Zeilen, die mit der Auswahl {Sheet: Zeilenpositionen} wegfallen.
+
+    Folgt FREMDSCHLUESSEL (und VERWAIST, wenn die Auswahl aus den dort genannten
+    Sheets stammt) transitiv über die Rückverweise des Stores, der Aufwand wächst
+    also mit der Zahl der betroffenen Zeilen, nicht mit der Größe der Sheets. Gibt {Sheet: sortierte Positionen} zurück.
+    """
+    geloescht = {}
+    verwaist = [(eltern, kind, spalte) for eltern, kind, spalte, start in VERWAIST if start & set(auswahl)]
+    offen = [(name, np.asarray(positionen, dtype=np.int64)) for name, positionen in auswahl.items()]
+    while offen:
+        name, positionen = offen.pop(0)
+        _, df = store.sheet_readonly(name)
+        maske = geloescht.setdefault(name, np.zeros(len(df), dtype=bool))
+        neu = np.unique(positionen[~maske[positionen]])
+        if not len(neu):
+            continue
+        maske[neu] = True
+        for kind, spalte, eltern in FREMDSCHLUESSEL:
+            if eltern == name and spalte in df.columns:
+                verweise = store.rueckverweise(kind, spalte)
+                treffer = [verweise[i] for i in _ids(df, spalte, neu) if i in verweise]
+                if treffer:
+                    offen.append((kind, np.concatenate(treffer)))
+        for eltern, kind, spalte in verwaist:
+            if kind == name and spalte in df.columns:
+                kinder = store.rueckverweise(kind, spalte)
+                eltern_zeilen = store.rueckverweise(eltern, spalte)
+                treffer = [eltern_zeilen[i] for i in _ids(df, spalte, neu)
+                           if i in eltern_zeilen and maske[kinder[i]].all()]
+                if treffer:
+                    offen.append((eltern, np.concatenate(treffer)))
+    return {name: np.flatnonzero(maske) for name, maske in geloescht.items() if maske.any()}
+
+
+def loesche(store, plan):
+    """Schreibt einen Löschplan in einer Transaktion; nur die betroffenen Sheets ändern sich."""
+    with store.transaction() as tx:
+        for name, positionen in plan.items():
+            _, df = store.sheet_readonly(name)
+            keys = primary_key(name, df)
+            weg = df.iloc[positionen]
+            schluessel = set(weg[keys].itertuples(index=False, name=None)) if keys else set()
+            if keys and not weg[keys].isna().any().any() and _schluessel_maske(df, keys, schluessel).sum() == len(weg):
+                tx.delete(name, schluessel)
+            else:
+                # Ohne eindeutigen Schlüssel bleibt nur das ganze Sheet
+                tx.replace(name, df.drop(index=df.index[positionen]))
+
+
+def sqlite_pfad(pfad):
+    return os.path.splitext(pfad)[0] + ".sqlite"
+
+
+def _erzeuge_backend(pfad):
+    if pfad.endswith((".sqlite", ".db")):
+        return SqliteBackend(pfad)
+    db_pfad = sqlite_pfad(pfad)
+    if BACKEND == "sqlite" or (BACKEND != "excel" and os.path.exists(db_pfad)):
+        return SqliteBackend(db_pfad, excel_pfad=pfad)
+    return ExcelBackend(pfad)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(pfad=DATA_FILE):
+    with _stores_lock:
+        store = _stores.get(pfad)
+        if store is None:
+            store = _stores[pfad] = ModelStore(_erzeuge_backend(pfad))
+        return store
+
+
+def activate_sqlite(pfad=DATA_FILE):
+    # Importiert die Excel-Datei in Datenmodell.sqlite; ab dann lesen alle Seiten daraus
+    with _stores_lock:
+        alt = _stores.get(pfad)
+        if alt is not None and isinstance(alt.backend, ExcelBackend):
+            # Offene Journal-Einträge erst in die xlsx, sonst fehlen sie im Import
+            alt.backend.verdichte()
+        _stores[pfad] = store = ModelStore(SqliteBackend(sqlite_pfad(pfad), excel_pfad=pfad))
+        return store
\ No newline at end of file
@@ -0,0 +1,146 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+import pandas as pd
+import streamlit as st
+from openpyxl import Workbook
+
+# Format -> (Bezeichnung, Dateiendung, MIME-Typ)
+FORMATE = {
+    "xlsx": ("Excel (.xlsx)", ".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv": ("CSV (.csv)", ".csv", "text/csv"),
+    "jsonl": ("JSON Lines (.jsonl)", ".jsonl", "application/x-ndjson"),
+    "parquet": ("Parquet (.parquet)", ".parquet", "application/vnd.apache.parquet"),
+}
+
+# Ab so vielen Zellen wird xlsx mit dem Write-only-Writer von openpyxl erzeugt
+GROSS_AB_ZELLEN = 200_000
+
+# Höchstens so viele Bytes an fertigen Dateien im Speicher halten
+CACHE_BYTES = 256 * 1024 * 1024
+
+
+def _parquet_verfuegbar():
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def verfuegbare_formate():
+    return [f for f in FORMATE if f != "parquet" or _parquet_verfuegbar()]
+
+
+def frame_hash(df):
+    # Inhalt, Spalten und Typen; gleiche Ergebnisse ergeben denselben Schlüssel
+    h = hashlib.sha256()
+    h.update(repr((list(df.columns), [str(t) for t in df.dtypes])).encode("utf-8"))
+    try:
+        h.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    except TypeError:
+        # Nicht hashbare Zellen (z. B. Listen): über die Textdarstellung
+        h.update(df.to_csv(index=False).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _xlsx_write_only(df, sheet_name):
+    # Zeilen direkt in den Writer streamen statt alle Zellen als Objekte aufzubauen
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(sheet_name)
+    ws.append([str(c) for c in df.columns])
+    for row in df.itertuples(index=False, name=None):
+        ws.append([None if pd.isna(v) else v for v in row])
+    output = BytesIO()
+    wb.save(output)
+    return output.getvalue()
+
+
+def _parquet(df):
+    try:
+        return df.to_parquet(index=False)
+    except Exception:
+        # Gemischte Typen in einer Spalte kann Arrow nicht speichern: als Text ablegen
+        text_spalten = df.select_dtypes(include="object").columns
+        return df.astype({c: "string" for c in text_spalten}).to_parquet(index=False)
+
+
+def serialisiere(df, dateiformat, sheet_name="Daten"):
+    if dateiformat == "xlsx":
+        if df.size >= GROSS_AB_ZELLEN:
+            return _xlsx_write_only(df, sheet_name)
+        output = BytesIO()
+        with pd.ExcelWriter(output, engine="openpyxl") as writer:
+            df.to_excel(writer, index=False, sheet_name=sheet_name)
+        return output.getvalue()
+    if dateiformat == "csv":
+        # Semikolon und BOM, damit Excel die Datei mit deutschen Einstellungen richtig öffnet
+        return df.to_csv(index=False, sep=";").encode("utf-8-sig")
+    if dateiformat == "jsonl":
+        return df.to_json(orient="records", lines=True, force_ascii=False, date_format="iso").encode("utf-8")
+    if dateiformat == "parquet":
+        return _parquet(df)
+    raise ValueError(f"Unbekanntes Exportformat: {dateiformat}")
+
+
+_cache = OrderedDict()
+_cache_bytes = 0
+_cache_lock = threading.Lock()
+
+
+def exportiere(df, dateiformat, sheet_name="Daten"):
+    """Serialisiert df einmal je Inhalt und Format; danach kommt die Datei aus dem Cache.
+
+    Der Cache gilt für den ganzen Prozess, also auch über Sessions und Seiten hinweg,
+    und verdrängt die am längsten nicht genutzten Dateien ab CACHE_BYTES.
+    """
+    global _cache_bytes
+    key = (frame_hash(df), dateiformat, sheet_name)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    daten = serialisiere(df, dateiformat, sheet_name)
+
+    with _cache_lock:
+        if key not in _cache:
+            _cache[key] = daten
+            _cache_bytes += len(daten)
+            while _cache_bytes > CACHE_BYTES and len(_cache) > 1:
+                _, alt = _cache.popitem(last=False)
+                _cache_bytes -= len(alt)
+    return daten
+
+
+def download_bereich(df, dateiname, sheet_name="Daten", key="export", auf_anforderung=False):
+    """Formatauswahl und Download-Button für einen DataFrame.
+
+    dateiname ist ohne Endung. Mit auf_anforderung wird die Datei erst nach einem Klick
+    erzeugt, sinnvoll wenn sich df häufig ändert (z. B. beim Umschalten von Bedingungen).
+    """
+    formate = verfuegbare_formate()
+    dateiformat = st.selectbox(
+        "Format",
+        options=formate,
+        format_func=lambda f: FORMATE[f][0],
+        key=f"{key}_format"
+    )
+    bezeichnung, endung, mime = FORMATE[dateiformat]
+
+    if auf_anforderung:
+        auftrag = (frame_hash(df), dateiformat)
+        if st.button(f" Ergebnis als {bezeichnung} erzeugen", key=f"{key}_erzeugen"):
+            st.session_state[f"{key}_auftrag"] = auftrag
+        if st.session_state.get(f"{key}_auftrag") != auftrag:
+            return
+
+    st.download_button(
+        label=f" Download {dateiname}{endung}",
+        data=exportiere(df, dateiformat, sheet_name),
+        file_name=f"{dateiname}{endung}",
+        mime=mime,
+        key=f"{key}_download"
+    )
\ No newline at end of file
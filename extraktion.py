@@ -0,0 +1,315 @@
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+
+MASKEN_DATEI = "/Matching/masken.json"
+
+
+def lade_masken():
+    if not os.path.exists(MASKEN_DATEI):
+        return {}
+    with open(MASKEN_DATEI, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def speichere_masken(masken):
+    # Erst vollständig schreiben, dann ersetzen: der Daemon liest die Datei jederzeit
+    tmp_pfad = f"{MASKEN_DATEI}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_pfad, "w", encoding="utf-8") as f:
+            json.dump(masken, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_pfad, MASKEN_DATEI)
+    except BaseException:
+        if os.path.exists(tmp_pfad):
+            os.remove(tmp_pfad)
+        raise
+    # Index sofort mit den gespeicherten Masken erneuern
+    with _index_lock:
+        _index_cache[MASKEN_DATEI] = (_masken_signatur(), MaskenIndex(masken))
+
+
+def _masken_signatur():
+    try:
+        stat = os.stat(MASKEN_DATEI)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+_index_cache = {}
+_index_lock = threading.Lock()
+
+
+def masken_index():
+    """Index über alle Masken aus masken.json, neu aufgebaut nur wenn sich die Datei ändert."""
+    signatur = _masken_signatur()
+    with _index_lock:
+        eintrag = _index_cache.get(MASKEN_DATEI)
+        if eintrag and eintrag[0] == signatur:
+            return eintrag[1]
+        index = MaskenIndex(lade_masken())
+        _index_cache[MASKEN_DATEI] = (signatur, index)
+        return index
+
+
+class MaskenIndex:
+    """Ordnet Spaltennamen und Sheet-Suchbegriffe den Masken zu, die sie verwenden.
+
+    bewerte() prüft damit alle Masken in einem Durchgang über die Kopfzeilen einer
+    Datei, statt jede Maske einzeln gegen alle Sheets zu testen.
+    """
+
+    def __init__(self, masken):
+        self.namen = list(masken)
+        self.spalten = {}
+        self.keywords = {}
+        self._nach_spalte = {}
+        self._nach_keyword = {}
+        self._alle_sheets = []
+        for name, maske in masken.items():
+            spalten = list(dict.fromkeys(maske.get("columns", [])))
+            keywords = sheet_keywords(sheet_keyword_text(maske))
+            self.spalten[name] = spalten
+            self.keywords[name] = keywords
+            for spalte in spalten:
+                self._nach_spalte.setdefault(spalte, []).append(name)
+            if keywords:
+                for kw in keywords:
+                    self._nach_keyword.setdefault(kw, []).append(name)
+            else:
+                self._alle_sheets.append(name)
+
+    def bewerte(self, koepfe):
+        """Bewertet alle Masken gegen {Sheet: Spalten der Kopfzeile}.
+
+        Gibt je Maske (Name, Abdeckung, gefundene Spalten, passende Sheets) zurück,
+        beste Maske zuerst. Abdeckung ist der Anteil der Maskenspalten, die in einem
+        zur Maske passenden Sheet vorkommen. Sortiert wird nach der Zahl gefundener
+        Spalten plus der Zahl der Sheet-Suchbegriffe mit Treffer; die Abdeckung
+        entscheidet nur bei Gleichstand.
+        """
+        gefunden = {name: set() for name in self.namen}
+        sheets = {name: 0 for name in self.namen}
+        kw_treffer = {name: set() for name in self.namen}
+        for sheet, spalten in koepfe.items():
+            sheet_lower = sheet.lower()
+            passend = set(self._alle_sheets)
+            for kw, namen in self._nach_keyword.items():
+                if kw in sheet_lower:
+                    passend.update(namen)
+                    for name in namen:
+                        kw_treffer[name].add(kw)
+            if not passend:
+                continue
+            for name in passend:
+                sheets[name] += 1
+            for spalte in spalten:
+                for name in self._nach_spalte.get(spalte, ()):
+                    if name in passend:
+                        gefunden[name].add(spalte)
+
+        ergebnis = []
+        for pos, name in enumerate(self.namen):
+            anzahl = len(self.spalten[name])
+            abdeckung = len(gefunden[name]) / anzahl if anzahl else 0.0
+            punkte = len(gefunden[name]) + len(kw_treffer[name])
+            ergebnis.append((name, abdeckung, len(gefunden[name]), sheets[name], punkte, pos))
+        ergebnis.sort(key=lambda e: (-e[4], -e[1], -e[3], e[5]))
+        return [e[:4] for e in ergebnis]
+
+
+def sheet_keyword_text(maske):
+    # "sheet_keyword" ist meist ein String, in älteren Masken auch eine Liste
+    keyword = maske.get("sheet_keyword", "")
+    return ", ".join(keyword.split(",") if isinstance(keyword, str) else keyword)
+
+
+def sheet_keywords(text):
+    return [kw.strip().lower() for kw in text.split(",") if kw.strip()]
+
+
+def passende_sheets(sheet_names, keywords):
+    if not keywords:
+        return list(sheet_names)
+    return [s for s in sheet_names if any(kw in s.lower() for kw in keywords)]
+
+
+def kopfzeilen(quelle):
+    # Nur die Kopfzeile jedes Sheets lesen: {Sheet: Spalten} und {Sheet: Fehlermeldung}
+    xls = pd.ExcelFile(quelle)
+    try:
+        koepfe = {}
+        fehler = {}
+        for sheet in xls.sheet_names:
+            try:
+                koepfe[sheet] = list(pd.read_excel(xls, sheet_name=sheet, skiprows=1, nrows=0).columns)
+            except Exception as e:
+                koepfe[sheet] = []
+                fehler[sheet] = str(e)
+        return koepfe, fehler
+    finally:
+        xls.close()
+
+
+def spalten_ermitteln(koepfe, sheets):
+    # Spalten der gewählten Sheets in Reihenfolge des ersten Auftretens
+    spalten = {}
+    for sheet in sheets:
+        spalten.update(dict.fromkeys(koepfe.get(sheet, [])))
+    return list(spalten)
+
+
+def _oeffne(quelle):
+    if isinstance(quelle, pd.ExcelFile):
+        return quelle
+    return pd.ExcelFile(BytesIO(quelle) if isinstance(quelle, bytes) else quelle)
+
+
+def _lese_sheet_aus(xls, sheet, spalten):
+    # usecols verkleinert nur das Ergebnis: openpyxl liest trotzdem jede Zelle jeder Zeile.
+    # Die Lesezeit sinkt dadurch nicht, für sehr große Dateien gibt es extrahiere_streaming.
+    gewuenscht = set(spalten)
+    df = pd.read_excel(xls, sheet_name=sheet, skiprows=1, usecols=lambda col: col in gewuenscht)
+    return df[[col for col in spalten if col in df.columns]]
+
+
+# Nur in den Worker-Prozessen belegt; jeder Prozess hat seine eigene Kopie
+_quelle = None
+_xls = None
+
+
+def _init_worker(quelle):
+    # Die Datei wird je Worker einmal übergeben und geöffnet, nicht je Sheet
+    global _quelle, _xls
+    _quelle = quelle
+    _xls = None
+
+
+def _lese_sheet(sheet, spalten):
+    global _xls
+    if _xls is None:
+        _xls = _oeffne(_quelle)
+    return _lese_sheet_aus(_xls, sheet, spalten)
+
+
+def _prozesse_verfuegbar():
+    # In stlite (Pyodide) gibt es keine Prozesse
+    return sys.platform != "emscripten"
+
+
+def _lese_parallel(quelle, sheets, spalten, workers):
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(quelle,)) as pool:
+        futures = [pool.submit(_lese_sheet, sheet, spalten) for sheet in sheets]
+        ergebnisse = []
+        for future in futures:
+            try:
+                ergebnisse.append((future.result(), None))
+            except BrokenProcessPool:
+                raise
+            except Exception as e:
+                ergebnisse.append((None, str(e)))
+        return ergebnisse
+
+
+def _lese_sequenziell(quelle, sheets, spalten):
+    # Lokal geöffnet: läuft in den Threads mehrerer Sessions gleichzeitig
+    xls = _oeffne(quelle)
+    ergebnisse = []
+    try:
+        for sheet in sheets:
+            try:
+                ergebnisse.append((_lese_sheet_aus(xls, sheet, spalten), None))
+            except Exception as e:
+                ergebnisse.append((None, str(e)))
+    finally:
+        if xls is not quelle:
+            xls.close()
+    return ergebnisse
+
+
+def extrahiere(quelle, sheets, spalten, workers=1):
+    """Liest je Sheet nur die gewünschten Spalten und hängt alles in Sheet-Reihenfolge an.
+
+    quelle ist ein Pfad oder die Datei als bytes. Mit workers > 1 wird jedes Sheet in
+    einem eigenen Prozess gelesen; ohne Prozesse (stlite) wird nacheinander gelesen.
+    Gibt (final_df, fehler) zurück, fehler ordnet Sheets ihre Fehlermeldung zu.
+    """
+    ergebnisse = None
+    if workers > 1 and len(sheets) > 1 and _prozesse_verfuegbar():
+        try:
+            ergebnisse = _lese_parallel(quelle, sheets, spalten, min(workers, len(sheets)))
+        except (OSError, NotImplementedError, ImportError, BrokenProcessPool):
+            ergebnisse = None
+    if ergebnisse is None:
+        ergebnisse = _lese_sequenziell(quelle, sheets, spalten)
+
+    fehler = {sheet: meldung for sheet, (_, meldung) in zip(sheets, ergebnisse) if meldung is not None}
+    extracted_data = [df for df, _ in ergebnisse if df is not None]
+    if not extracted_data:
+        return pd.DataFrame(columns=spalten), fehler
+
+    final_df = pd.concat(extracted_data, ignore_index=True)
+    final_df.dropna(how="all", inplace=True)
+    return final_df, fehler
+
+
+def _leer(wert):
+    # Wie dropna(how="all") im pandas-Pfad: nur fehlende Werte, Leerzeichen zählen als Inhalt
+    return wert is None or (isinstance(wert, float) and wert != wert)
+
+
+def _spalten_positionen(kopf, spalten):
+    # Erste Position je gewünschter Spalte, wie df[col] bei doppelten Überschriften
+    positionen = {}
+    for i, name in enumerate(kopf):
+        if name in spalten and name not in positionen:
+            positionen[name] = i
+    return positionen
+
+
+def extrahiere_streaming(quelle, sheets, spalten, ziel, sheet_name="Gefilterte_Daten"):
+    """Wie extrahiere(), aber zeilenweise von Datei zu Datei ohne DataFrames.
+
+    Gelesen wird mit einem Read-only-Workbook, geschrieben mit einem Write-only-Workbook
+    nach ziel (Pfad oder Dateiobjekt). Der Speicherbedarf hängt damit nur von einer Zeile
+    ab, nicht von der Größe der Datei. Gibt die Anzahl geschriebener Zeilen zurück.
+    """
+    gewuenscht = set(spalten)
+    quelle_wb = load_workbook(quelle, read_only=True, data_only=True, keep_links=False)
+    try:
+        # Erst nur die Kopfzeilen: die Ausgabe braucht alle Spalten vorab
+        koepfe = {}
+        for sheet in sheets:
+            ws = quelle_wb[sheet]
+            ws.reset_dimensions()
+            kopf = next(ws.iter_rows(min_row=2, max_row=2, values_only=True), ())
+            koepfe[sheet] = _spalten_positionen(kopf, gewuenscht)
+        vorhanden = set().union(*koepfe.values())
+        ausgabe_spalten = [col for col in spalten if col in vorhanden]
+
+        ziel_wb = Workbook(write_only=True)
+        ziel_ws = ziel_wb.create_sheet(sheet_name)
+        ziel_ws.append(ausgabe_spalten)
+        zeilen = 0
+        for sheet in sheets:
+            positionen = koepfe[sheet]
+            if not positionen:
+                continue
+            indizes = [positionen.get(col) for col in ausgabe_spalten]
+            for row in quelle_wb[sheet].iter_rows(min_row=3, values_only=True):
+                werte = [row[i] if i is not None and i < len(row) else None for i in indizes]
+                if all(_leer(w) for w in werte):
+                    continue
+                ziel_ws.append(werte)
+                zeilen += 1
+        ziel_wb.save(ziel)
+        return zeilen
+    finally:
+        quelle_wb.close()
\ No newline at end of file
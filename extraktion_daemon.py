@@ -0,0 +1,233 @@
+"""Überwacht einen Eingangsordner und extrahiert neue Excel-Dateien mit einer Maske.
+
+Beispiel:
+    python extraktion_daemon.py --maske ESRS
+    python extraktion_daemon.py --maske ESRS --eingang C:/Matching/Eingang --ausgang C:/Matching/Ausgang --einmal
+
+Jede neue oder geänderte Datei im Eingang wird mit der Maske aus masken.json
+(Sheet-Suchbegriffe und Spalten) gefiltert und als <Name>_gefiltert.xlsx in den
+Ausgang geschrieben. Bereits verarbeitete Inhalte stehen mit ihrem SHA-256 im
+Manifest (.manifest.json im Ausgang) und werden übersprungen.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+
+from extraktion import extrahiere, extrahiere_streaming, lade_masken, passende_sheets, sheet_keyword_text, sheet_keywords
+
+EINGANG = "/Matching/Eingang"
+AUSGANG = "/Matching/Ausgang"
+
+# Dateien, die gerade noch geschrieben werden, erst später anfassen
+MIN_ALTER_SEKUNDEN = 2
+
+
+def datei_hash(pfad):
+    h = hashlib.sha256()
+    with open(pfad, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def masken_hash(maske):
+    return hashlib.sha256(json.dumps(maske, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class Manifest:
+    def __init__(self, pfad):
+        self.pfad = pfad
+        try:
+            with open(pfad, "r", encoding="utf-8") as f:
+                self.eintraege = json.load(f)
+        except (OSError, ValueError):
+            self.eintraege = {}
+
+    def erledigt(self, datei, inhalt_hash, maske_hash):
+        eintrag = self.eintraege.get(datei)
+        return bool(eintrag) and eintrag["sha256"] == inhalt_hash and eintrag["maske"] == maske_hash
+
+    def eintragen(self, datei, inhalt_hash, maske_hash, status):
+        self.eintraege[datei] = {"sha256": inhalt_hash, "maske": maske_hash, "status": status, "zeit": time.time()}
+        tmp_pfad = self.pfad + ".tmp"
+        with open(tmp_pfad, "w", encoding="utf-8") as f:
+            json.dump(self.eintraege, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_pfad, self.pfad)
+
+
+def verarbeite(pfad, maske, ausgang):
+    start = time.perf_counter()
+    spalten = maske.get("columns", [])
+    xls = pd.ExcelFile(pfad)
+    try:
+        sheets = passende_sheets(xls.sheet_names, sheet_keywords(sheet_keyword_text(maske)))
+        # .xlsx wird zeilenweise direkt in die Ausgabe geschrieben, .xls nur über pandas
+        final_df, fehler = None, {}
+        if sheets and not pfad.lower().endswith(".xlsx"):
+            final_df, fehler = extrahiere(xls, sheets, spalten)
+    finally:
+        xls.close()
+    if not sheets:
+        return "keine passenden Sheets", 0, time.perf_counter() - start
+
+    ziel = os.path.join(ausgang, os.path.splitext(os.path.basename(pfad))[0] + "_gefiltert.xlsx")
+    fd, tmp_pfad = tempfile.mkstemp(suffix=".xlsx", dir=ausgang)
+    os.close(fd)
+    try:
+        # mkstemp legt die Datei nur für den Besitzer lesbar an (0600)
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp_pfad, 0o666 & ~umask)
+        if final_df is None:
+            zeilen = extrahiere_streaming(pfad, sheets, spalten, tmp_pfad)
+        else:
+            with pd.ExcelWriter(tmp_pfad, engine="openpyxl") as writer:
+                final_df.to_excel(writer, sheet_name="Gefilterte_Daten", index=False)
+            zeilen = len(final_df)
+        os.replace(tmp_pfad, ziel)
+    except BaseException:
+        if os.path.exists(tmp_pfad):
+            os.remove(tmp_pfad)
+        raise
+    status = "ok" if not fehler else "ok, Fehler in " + ", ".join(f"'{sheet}': {e}" for sheet, e in fehler.items())
+    return status, zeilen, time.perf_counter() - start
+
+
+class Daemon:
+    def __init__(self, eingang, ausgang, maske_name, workers):
+        self.eingang = eingang
+        self.ausgang = ausgang
+        self.maske_name = maske_name
+        self.workers = workers
+        self.manifest = Manifest(os.path.join(ausgang, ".manifest.json"))
+        # (mtime, Größe) je Datei, damit unveränderte Dateien nicht jedes Mal gehasht werden
+        self._gesehen = {}
+
+    def neue_dateien(self, maske_hash):
+        jetzt = time.time()
+        for name in sorted(os.listdir(self.eingang)):
+            if not name.lower().endswith((".xls", ".xlsx")) or name.startswith("~$"):
+                continue
+            pfad = os.path.join(self.eingang, name)
+            try:
+                stat = os.stat(pfad)
+                if jetzt - stat.st_mtime < MIN_ALTER_SEKUNDEN:
+                    continue
+                signatur = (stat.st_mtime_ns, stat.st_size, maske_hash)
+                if self._gesehen.get(name) == signatur:
+                    continue
+                inhalt_hash = datei_hash(pfad)
+            except OSError:
+                # Gelöscht oder noch gesperrt (Excel, Kopiervorgang): im nächsten Durchlauf erneut
+                continue
+            if self.manifest.erledigt(name, inhalt_hash, maske_hash):
+                self._gesehen[name] = signatur
+                continue
+            yield name, pfad, inhalt_hash, signatur
+
+    def durchlauf(self, pool):
+        # Die Maske wird jedes Mal neu gelesen, damit Änderungen in der App sofort greifen
+        maske = lade_masken().get(self.maske_name)
+        if maske is None:
+            print(f"Maske '{self.maske_name}' nicht in masken.json gefunden.")
+            return 0
+        maske_hash = masken_hash(maske)
+
+        laeufe = {}
+        pool_defekt = False
+        for name, pfad, inhalt_hash, signatur in self.neue_dateien(maske_hash):
+            if pool is None:
+                laeufe[name] = (inhalt_hash, signatur, _sofort(verarbeite, pfad, maske, self.ausgang))
+                continue
+            try:
+                laeufe[name] = (inhalt_hash, signatur, pool.submit(verarbeite, pfad, maske, self.ausgang))
+            except BrokenProcessPool:
+                pool_defekt = True
+                break
+
+        futures = {future: name for name, (_, _, future) in laeufe.items()}
+        for future in as_completed(futures):
+            name = futures[future]
+            inhalt_hash, signatur, _ = laeufe[name]
+            try:
+                status, zeilen, dauer = future.result()
+                print(f"{name}: {status}, {zeilen} Zeilen in {dauer:.2f}s")
+            except BrokenProcessPool:
+                # Kein Ergebnis der Datei (z. B. Worker vom System beendet): nicht eintragen, erneut versuchen
+                pool_defekt = True
+                print(f"{name}: Worker-Prozess abgebrochen, wird erneut versucht")
+                continue
+            except Exception as e:
+                status = f"Fehler: {e}"
+                print(f"{name}: {status}")
+            # Auch fehlerhafte Dateien eintragen: erst eine neue Version wird erneut versucht
+            self.manifest.eintragen(name, inhalt_hash, maske_hash, status)
+            self._gesehen[name] = signatur
+        if pool_defekt:
+            raise BrokenProcessPool("Prozesspool ist ausgefallen.")
+        return len(laeufe)
+
+    def starte(self, intervall, einmal=False):
+        os.makedirs(self.eingang, exist_ok=True)
+        os.makedirs(self.ausgang, exist_ok=True)
+        pool = self._neuer_pool()
+        try:
+            while True:
+                try:
+                    self.durchlauf(pool)
+                except BrokenProcessPool as e:
+                    print(f"{e} Neuer Pool wird gestartet.")
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = self._neuer_pool()
+                except Exception as e:
+                    # z. B. masken.json gerade unlesbar oder Ausgang nicht erreichbar: weiter überwachen
+                    print(f"Durchlauf fehlgeschlagen: {e}")
+                if einmal:
+                    return
+                time.sleep(intervall)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+    def _neuer_pool(self):
+        return ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+
+
+def _sofort(funktion, *args):
+    # Ohne Prozesspool synchron ausführen, aber wie ein Future behandeln
+    future = Future()
+    try:
+        future.set_result(funktion(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Eingangsordner überwachen und Excel-Dateien mit einer Maske extrahieren.")
+    parser.add_argument("--maske", required=True, help="Name der Maske aus masken.json")
+    parser.add_argument("--eingang", default=EINGANG, help="Überwachter Ordner")
+    parser.add_argument("--ausgang", default=AUSGANG, help="Ordner für die gefilterten Dateien")
+    parser.add_argument("--intervall", type=float, default=5.0, help="Sekunden zwischen zwei Durchläufen")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1), help="Parallel verarbeitete Dateien")
+    parser.add_argument("--einmal", action="store_true", help="Nur einen Durchlauf ausführen")
+    args = parser.parse_args(argv)
+
+    daemon = Daemon(args.eingang, args.ausgang, args.maske, args.workers)
+    try:
+        daemon.starte(args.intervall, einmal=args.einmal)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,190 @@
+"""Typisierter Zugriff auf das Sheet "Kennzahl".
+
+"Wert" ist im Datenmodell freier Text (z. B. "1.234,5 t CO2e", "12 %",
+"3,5 Mio. €"). KennzahlIndex legt daneben eine Zahl und eine Einheit ab und
+sortiert die Zeilen nach (Datenpunkt-ID, Stakeholder-ID, Jahr), sodass
+Einzelwerte und Jahresreihen per Binärsuche statt per Scan über das ganze
+Sheet gefunden werden. Neu gebaut wird nur, wenn sich das Sheet im Store
+geändert hat; der Text in der xlsx bleibt unverändert maßgeblich.
+"""
+import re
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+
+SHEET = "Kennzahl"
+SCHLUESSEL = ["Datenpunkt-ID", "Stakeholder-ID", "Jahr"]
+
+# Faktoren vor der Einheit, z. B. "3,5 Mio. €" = 3500000 €
+FAKTOREN = {
+    "tsd": 1e3, "tsd.": 1e3, "tausend": 1e3,
+    "mio": 1e6, "mio.": 1e6, "million": 1e6, "millionen": 1e6,
+    "mrd": 1e9, "mrd.": 1e9, "milliarde": 1e9, "milliarden": 1e9,
+}
+
+_ZAHL = re.compile(r"^(?P<vor>[^\d+\-−]*?)\s*(?P<zahl>[+\-−]?\s*\d[\d.,'\u00a0\u202f]*)(?P<nach>.*)$")
+_TAUSENDER = re.compile(r"^[1-9]\d{0,2}(\.\d{3})+$")
+
+
+def _zahl(text):
+    # Deutsches Format zuerst: "1.234,5"; "1,234.5" wird am letzten Trennzeichen erkannt
+    text = re.sub(r"[\s'\u00a0\u202f]", "", text).replace("−", "-")
+    text = text.rstrip(".,")
+    if "," in text and "." in text:
+        if text.rfind(",") > text.rfind("."):
+            text = text.replace(".", "").replace(",", ".")
+        else:
+            text = text.replace(",", "")
+    elif "," in text:
+        if text.count(",") > 1:
+            return np.nan
+        text = text.replace(",", ".")
+    elif _TAUSENDER.match(text.lstrip("+-")):
+        text = text.replace(".", "")
+    try:
+        return float(text)
+    except ValueError:
+        return np.nan
+
+
+def wert_als_zahl(wert):
+    """(Zahl, Einheit) aus einem Kennzahl-Wert; (nan, "") wenn keine einzelne Zahl erkennbar ist."""
+    if wert is None or (isinstance(wert, float) and np.isnan(wert)):
+        return np.nan, ""
+    if isinstance(wert, (int, float, np.integer, np.floating)) and not isinstance(wert, bool):
+        return float(wert), ""
+    treffer = _ZAHL.match(str(wert).strip())
+    if not treffer:
+        return np.nan, ""
+    nach = treffer["nach"].strip()
+    # Eine zweite Zahl (z. B. "10-20" oder "5 von 8") ist keine einzelne Zahl; "CO2" in der Einheit schon
+    if re.search(r"\b\d", nach) or re.search(r"\d", treffer["vor"]):
+        return np.nan, ""
+    zahl = _zahl(treffer["zahl"])
+    if np.isnan(zahl):
+        return np.nan, ""
+    teile = nach.split(maxsplit=1)
+    if teile and teile[0].lower() in FAKTOREN:
+        zahl *= FAKTOREN[teile[0].lower()]
+        nach = teile[1] if len(teile) > 1 else ""
+    einheit = " ".join(t for t in (treffer["vor"].strip(), nach) if t)
+    return zahl, einheit
+
+
+def _als_id(wert):
+    # Wie im Datenmodell: 5, 5.0 und "5" sind derselbe Schlüssel
+    try:
+        return float(str(wert).strip())
+    except ValueError:
+        return np.nan
+
+
+class KennzahlIndex:
+    def __init__(self, df):
+        self.df = df
+        spalten = [pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=float) if c in df.columns
+                   else np.full(len(df), np.nan) for c in SCHLUESSEL]
+        # Sortiert nach Datenpunkt, dann Stakeholder, dann Jahr; NaN landen am Ende
+        self._reihenfolge = np.lexsort(spalten[::-1])
+        self._dp, self._sh, self._jahr = (s[self._reihenfolge] for s in spalten)
+        # Für die Frage "welche Datenpunkte hat ein Stakeholder"
+        self._nach_sh = np.argsort(spalten[1], kind="stable")
+        self._sh_sortiert = spalten[1][self._nach_sh]
+        self._sh_dp = spalten[0][self._nach_sh]
+
+        werte = df["Wert"] if "Wert" in df.columns else pd.Series(np.nan, index=df.index)
+        geparst = {}
+        zahlen, einheiten = [], []
+        for wert in werte.tolist():
+            schluessel = wert if isinstance(wert, str) else repr(wert)
+            if schluessel not in geparst:
+                geparst[schluessel] = wert_als_zahl(wert)
+            zahl, einheit = geparst[schluessel]
+            zahlen.append(zahl)
+            einheiten.append(einheit)
+        self.zahlen = np.array(zahlen, dtype=float)
+        self.einheiten = np.array(einheiten, dtype=object)
+
+    @staticmethod
+    def _bereich(sortiert, lo, hi, von, bis):
+        # [lo, hi) eingegrenzt auf von <= x <= bis innerhalb eines sortierten Abschnitts; None = offen
+        abschnitt = sortiert[lo:hi]
+        start = lo + (np.searchsorted(abschnitt, von, side="left") if von is not None else 0)
+        ende = lo + (np.searchsorted(abschnitt, bis, side="right") if bis is not None else hi - lo)
+        return start, max(start, ende)
+
+    def positionen(self, datenpunkt, stakeholder=None, von=None, bis=None):
+        """Zeilenpositionen im Sheet, sortiert nach Stakeholder und Jahr."""
+        dp = _als_id(datenpunkt)
+        if np.isnan(dp):
+            return np.array([], dtype=np.int64)
+        lo, hi = self._bereich(self._dp, 0, len(self._dp), dp, dp)
+        if stakeholder is not None:
+            sh = _als_id(stakeholder)
+            if np.isnan(sh):
+                return np.array([], dtype=np.int64)
+            lo, hi = self._bereich(self._sh, lo, hi, sh, sh)
+            lo, hi = self._bereich(self._jahr, lo, hi, von, bis)
+            return self._reihenfolge[lo:hi]
+        if von is None and bis is None:
+            return self._reihenfolge[lo:hi]
+        # Ohne Stakeholder ist das Jahr nur je Stakeholder sortiert
+        jahre = self._jahr[lo:hi]
+        maske = np.ones(len(jahre), dtype=bool)
+        if von is not None:
+            maske &= jahre >= von
+        if bis is not None:
+            maske &= jahre <= bis
+        return self._reihenfolge[lo:hi][maske]
+
+    def _zeilen(self, positionen):
+        zeilen = self.df.iloc[positionen].copy()
+        zeilen["Zahl"] = self.zahlen[positionen]
+        zeilen["Einheit"] = self.einheiten[positionen]
+        return zeilen
+
+    def reihe(self, datenpunkt, stakeholder=None, von=None, bis=None):
+        """Kennzahlen eines Datenpunkts (optional eines Stakeholders, Jahre von..bis) mit "Zahl" und "Einheit"."""
+        return self._zeilen(self.positionen(datenpunkt, stakeholder, von, bis))
+
+    def wert(self, datenpunkt, stakeholder, jahr):
+        """Die Kennzahl(en) zu genau einem Schlüssel; meist eine Zeile, leer wenn keine existiert."""
+        return self.reihe(datenpunkt, stakeholder, jahr, jahr)
+
+    def datenpunkte_von(self, stakeholder):
+        """Datenpunkt-IDs, zu denen der Stakeholder Kennzahlen hat."""
+        sh = _als_id(stakeholder)
+        if np.isnan(sh):
+            return np.array([])
+        lo, hi = self._bereich(self._sh_sortiert, 0, len(self._sh_sortiert), sh, sh)
+        ids = self._sh_dp[lo:hi]
+        return np.unique(ids[~np.isnan(ids)])
+
+
+class Kennzahlen:
+    def __init__(self, store):
+        self.store = store
+        self._eintrag = None
+        self._lock = threading.Lock()
+
+    def index(self):
+        version, df = self.store.sheet_readonly(SHEET)
+        with self._lock:
+            if self._eintrag is None or self._eintrag[0] != version:
+                self._eintrag = (version, KennzahlIndex(df))
+            return self._eintrag[1]
+
+
+_kennzahlen = weakref.WeakKeyDictionary()
+_kennzahlen_lock = threading.Lock()
+
+
+def kennzahlen(store):
+    """Der Kennzahl-Index des Stores, geteilt von allen Seiten und Sessions."""
+    with _kennzahlen_lock:
+        eintrag = _kennzahlen.get(store)
+        if eintrag is None:
+            eintrag = _kennzahlen[store] = Kennzahlen(store)
+    return eintrag.index()
\ No newline at end of file
@@ -0,0 +1,205 @@
+"""Vektorisierte Massenimporte für "Einträge erstellen".
+
+Hochgeladene Dateien werden als Ganzes gegen vorab gebaute Lookups des
+Datenmodells verbunden, statt Zeile für Zeile die Sheets zu durchsuchen.
+Nicht zuordenbare Zeilen kommen gesammelt in einem Bericht zurück.
+"""
+import numpy as np
+import pandas as pd
+
+# Verbindet normalisierte Felder zu einem Schlüssel
+TRENNER = "\x1f"
+
+# Attribute des Datenpunkt-Imports in der Reihenfolge der Spaltenzuordnung
+IMPORT_ATTRIBUTE = ["Name", "Datentyp", "Gruppe", "Standard", "Paragraf"]
+
+
+def _als_zahl(serie):
+    return pd.to_numeric(serie.astype(str).str.strip(), errors="coerce")
+
+
+def _text_schluessel(serie):
+    # Leere Zellen bleiben leer und passen damit zu nichts
+    return serie.astype(str).str.strip().where(serie.notna())
+
+
+def normalisiere(serie):
+    # Für Vergleiche: ohne Rand- und doppelte Leerzeichen, ohne Groß-/Kleinschreibung; leere Zellen als ""
+    return serie.astype(str).str.strip().str.replace(r"\s+", " ", regex=True).str.casefold().where(serie.notna(), "")
+
+
+def _schluessel(*teile):
+    text = teile[0]
+    for teil in teile[1:]:
+        text = text + TRENNER + teil
+    return text
+
+
+def _in_menge(serie, menge):
+    # Mengen-Test je Wert; schneller als isin mit einer großen, wachsenden Menge
+    return pd.Series([wert in menge for wert in serie.tolist()], index=serie.index, dtype=bool)
+
+
+def _leer(serie):
+    return serie.isna() | (serie.astype(str).str.strip() == "")
+
+
+def paragraf_lookup(paragraf_df, basis):
+    """Paragraf-ID bzw. getrimmter Paragraf-Text -> Datenpunkt-ID; bei Dubletten gilt die erste Zeile."""
+    if basis == "Paragraf-ID":
+        schluessel = _als_zahl(paragraf_df["Paragraf-ID"])
+    else:
+        schluessel = _text_schluessel(paragraf_df["Paragraf"])
+    lookup = pd.Series(paragraf_df["Datenpunkt-ID"].to_numpy(), index=schluessel)
+    lookup = lookup[lookup.index.notna()]
+    return lookup[~lookup.index.duplicated()]
+
+
+def _ganzzahlig(serie):
+    if pd.api.types.is_float_dtype(serie) and len(serie) and (serie % 1 == 0).all():
+        return serie.astype("int64")
+    return serie
+
+
+def paragrafen_zuordnen(mapping, paragraf_df, rw_dp_df, basis, ref_spalte, standard_spalte, text_spalte,
+                        regelwerk_id):
+    """Übernimmt Paragrafen aus einer Mapping-Datei in ein Regelwerk.
+
+    Gibt (neue Paragrafen, neue Regelwerk-Datenpunkt-Verknüpfungen, Bericht der
+    nicht zugeordneten Zeilen) als DataFrames zurück. Die neuen Paragrafen haben
+    noch keine Paragraf-ID; die vergibt der Aufrufer, wenn er sie speichert.
+    """
+    ref = mapping[ref_spalte]
+    if basis == "Paragraf-ID":
+        schluessel = _als_zahl(ref)
+        ungueltig = schluessel.isna() | (schluessel % 1 != 0)
+    else:
+        schluessel = _text_schluessel(ref)
+        ungueltig = pd.Series(False, index=mapping.index)
+
+    datenpunkte = schluessel.map(paragraf_lookup(paragraf_df, basis))
+    gefunden = datenpunkte.notna() & ~ungueltig
+    datenpunkte = _ganzzahlig(datenpunkte[gefunden])
+
+    neue_paragrafen = pd.DataFrame({
+        "Regelwerk-ID": regelwerk_id,
+        "Datenpunkt-ID": datenpunkte.to_numpy(),
+        "Standard": mapping.loc[gefunden, standard_spalte].to_numpy(),
+        "Paragraf": mapping.loc[gefunden, text_spalte].to_numpy(),
+    })
+
+    # Jede Verknüpfung nur einmal, und nur wenn sie noch nicht gespeichert ist
+    vorhanden = set(zip(_als_zahl(rw_dp_df["Regelwerk-ID"]), _als_zahl(rw_dp_df["Datenpunkt-ID"]))) if not rw_dp_df.empty else set()
+    neue_links = neue_paragrafen[["Regelwerk-ID", "Datenpunkt-ID"]].drop_duplicates()
+    neu = [paar not in vorhanden for paar in zip(_als_zahl(neue_links["Regelwerk-ID"]), _als_zahl(neue_links["Datenpunkt-ID"]))]
+    neue_links = neue_links[neu].reset_index(drop=True)
+
+    fehlt = ~gefunden
+    bericht = pd.DataFrame({
+        "Zeile": mapping.index[fehlt.to_numpy()] + 2,
+        ref_spalte: ref[fehlt].to_numpy(),
+        "Grund": ungueltig[fehlt].map({True: f"Ungültige {basis}", False: "Kein passender Paragraf"}).to_numpy(),
+    })
+    return neue_paragrafen, neue_links, bericht
+
+
+def _ids_als_text(serie):
+    return _als_zahl(serie).astype(str)
+
+
+def datenpunkte_importieren(upload, spalten, modell, regelwerk_id, stakeholder_id, dp_start, pg_start):
+    """Plant den Import von Datenpunkten und Paragrafen aus einer Datei.
+
+    spalten ordnet jedem Eintrag aus IMPORT_ATTRIBUTE eine Spalte der Datei zu,
+    modell enthält die Sheets Datenpunkt, Paragraf, Regelwerk-Datenpunkt und
+    Stakeholder-Datenpunkt. Datenpunkte mit gleichem (Name, Gruppe, Datentyp)
+    werden wiederverwendet statt neu angelegt. Gibt ({Sheet: neue Zeilen},
+    Prüfbericht {Bezeichnung: Anzahl}) zurück; geschrieben wird hier nichts.
+    """
+    fehlend = [attribut for attribut in IMPORT_ATTRIBUTE if spalten.get(attribut) not in upload.columns]
+    if fehlend:
+        raise ValueError(f"Keine Spalte zugeordnet für: {', '.join(fehlend)}")
+
+    dp_df = modell["Datenpunkt"]
+    pg_df = modell["Paragraf"]
+    rw_dp_df = modell["Regelwerk-Datenpunkt"]
+    sh_dp_df = modell["Stakeholder-Datenpunkt"]
+
+    # Hash-Index der vorhandenen Datenpunkte: normalisierter Schlüssel -> ID
+    if dp_df.empty:
+        dp_index = pd.Series(dtype="float64")
+        bekannte_typen = set()
+    else:
+        dp_index = pd.Series(dp_df["Datenpunkt-ID"].to_numpy(), index=_schluessel(
+            normalisiere(dp_df["Name"]), normalisiere(dp_df["Gruppe"]), normalisiere(dp_df["Datentyp"])))
+        dp_index = dp_index[~dp_index.index.duplicated()]
+        bekannte_typen = set(normalisiere(dp_df["Datentyp"].dropna()))
+
+    pg_vorhanden = set()
+    if not pg_df.empty:
+        eigene = pg_df[_als_zahl(pg_df["Regelwerk-ID"]) == float(regelwerk_id)]
+        pg_vorhanden = set(_schluessel(_ids_als_text(eigene["Datenpunkt-ID"]), normalisiere(eigene["Paragraf"]),
+                                       normalisiere(eigene["Standard"])))
+    rw_vorhanden = set(_als_zahl(rw_dp_df.loc[_als_zahl(rw_dp_df["Regelwerk-ID"]) == float(regelwerk_id), "Datenpunkt-ID"])) if not rw_dp_df.empty else set()
+    sh_vorhanden = set(_als_zahl(sh_dp_df.loc[_als_zahl(sh_dp_df["Stakeholder-ID"]) == float(stakeholder_id), "Datenpunkt-ID"])) if not sh_dp_df.empty else set()
+
+    pruefung = {"Zeilen in der Datei": len(upload)}
+    for attribut in IMPORT_ATTRIBUTE:
+        pruefung[f"Leer: {attribut}"] = int(_leer(upload[spalten[attribut]]).sum())
+    pruefung.update({
+        "Unbekannter Datentyp": 0,
+        "Datenpunkt bereits im Datenmodell": 0,
+        "Datenpunkt mehrfach in der Datei": 0,
+        "Paragraf bereits vorhanden": 0,
+    })
+
+    # Ohne Namen kein Datenpunkt
+    teil = upload[~_leer(upload[spalten["Name"]])]
+
+    datentyp = normalisiere(teil[spalten["Datentyp"]])
+    if bekannte_typen:
+        pruefung["Unbekannter Datentyp"] = int((~_in_menge(datentyp, bekannte_typen) & (datentyp != "")).sum())
+    schluessel = _schluessel(normalisiere(teil[spalten["Name"]]), normalisiere(teil[spalten["Gruppe"]]), datentyp)
+
+    ids = schluessel.map(dp_index)
+    pruefung["Datenpunkt bereits im Datenmodell"] = int(ids.notna().sum())
+
+    # Neue Datenpunkte bekommen einen zusammenhängenden ID-Bereich
+    frisch = pd.unique(schluessel[ids.isna()])
+    frische_ids = pd.Series(np.arange(dp_start, dp_start + len(frisch)), index=frisch)
+    pruefung["Datenpunkt mehrfach in der Datei"] = int(ids.isna().sum()) - len(frisch)
+    erste = ids.isna() & ~schluessel.duplicated()
+    ids = _ganzzahlig(ids.fillna(schluessel.map(frische_ids)))
+
+    neue = {"Datenpunkt": pd.DataFrame({
+        "Datenpunkt-ID": ids[erste].to_numpy(),
+        "Name": teil.loc[erste, spalten["Name"]].to_numpy(),
+        "Datentyp": teil.loc[erste, spalten["Datentyp"]].to_numpy(),
+        "Gruppe": teil.loc[erste, spalten["Gruppe"]].to_numpy(),
+    })}
+
+    # Paragrafen: gleicher Datenpunkt, Text und Standard im selben Regelwerk nur einmal
+    pg_schluessel = _schluessel(_ids_als_text(ids), normalisiere(teil[spalten["Paragraf"]]),
+                                normalisiere(teil[spalten["Standard"]]))
+    schon_da = _in_menge(pg_schluessel, pg_vorhanden)
+    pruefung["Paragraf bereits vorhanden"] = int(schon_da.sum())
+    pg_neu = ~schon_da & ~pg_schluessel.duplicated()
+    neue["Paragraf"] = pd.DataFrame({
+        "Paragraf-ID": np.arange(pg_start, pg_start + int(pg_neu.sum())),
+        "Regelwerk-ID": regelwerk_id,
+        "Datenpunkt-ID": ids[pg_neu].to_numpy(),
+        "Standard": teil.loc[pg_neu, spalten["Standard"]].to_numpy(),
+        "Paragraf": teil.loc[pg_neu, spalten["Paragraf"]].to_numpy(),
+    })
+
+    # Verknüpfungen als Mengen-Differenz zu den gespeicherten
+    eindeutig = pd.unique(ids)
+    zahlen = _als_zahl(pd.Series(eindeutig))
+    for sheet, spalte, eltern_id, vorhanden in (
+            ("Regelwerk-Datenpunkt", "Regelwerk-ID", regelwerk_id, rw_vorhanden),
+            ("Stakeholder-Datenpunkt", "Stakeholder-ID", stakeholder_id, sh_vorhanden)):
+        neu = ~_in_menge(zahlen, vorhanden).to_numpy()
+        neue[sheet] = pd.DataFrame({spalte: eltern_id, "Datenpunkt-ID": eindeutig[neu]})
+
+    pruefung.update({f"Neu: {sheet}": len(df) for sheet, df in neue.items()})
+    return neue, pruefung
\ No newline at end of file
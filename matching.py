@@ -0,0 +1,216 @@
+import hashlib
+import os
+import threading
+from collections import deque
+
+import pandas as pd
+
+MATCHING_DATEI = "/Matching/Matching.xlsx"
+
+ALWAYS = "immer"
+
+# Spalten der Matching-Datei -> Spalten des Ergebnisses
+SPALTEN_MAPPING = {
+    "Id": "Id",
+    "DR": "Regelwerk",
+    "Paragraph": "Paragraph",
+    "Name": "Name",
+    "Datentyp": "Datentyp",
+    "Topic": "Gruppe"
+}
+
+
+SHORTLIST_SPALTEN = ["Unter-Unterthema", "Unterthema"]
+
+
+class ShortlistError(ValueError):
+    pass
+
+
+def _ohne_unnamed(df):
+    return df.loc[:, ~df.columns.str.contains("^Unnamed")]
+
+
+def read_shortlist(datei):
+    excel_file = pd.ExcelFile(datei)
+    if "Shortlist" not in excel_file.sheet_names:
+        raise ShortlistError(" Die hochgeladene Excel-Datei enthält kein Blatt namens 'Shortlist'.")
+    shortlist_df = _ohne_unnamed(excel_file.parse("Shortlist", dtype=str))
+    if not all(col in shortlist_df.columns for col in SHORTLIST_SPALTEN):
+        raise ShortlistError(" Die Shortlist-Datei muss die Spalten 'Unter-Unterthema' und 'Unterthema' enthalten.")
+    return shortlist_df
+
+
+def file_hash(pfad):
+    h = hashlib.sha256()
+    with open(pfad, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+_rules_cache = {}
+_rules_lock = threading.Lock()
+
+
+def load_rules(pfad):
+    """Liest die Matching-Datei einmal pro Prozess und Dateiinhalt.
+
+    Gibt (matching_df, hash) zurück. Der DataFrame wird zwischen Sessions geteilt
+    und darf nicht verändert werden. Neu gelesen wird erst, wenn sich nach einer
+    Änderung von mtime oder Größe auch der Hash der Datei unterscheidet.
+    """
+    stat = os.stat(pfad)
+    signatur = (stat.st_mtime_ns, stat.st_size)
+    with _rules_lock:
+        eintrag = _rules_cache.get(pfad)
+        if eintrag and eintrag[0] == signatur:
+            return eintrag[1], eintrag[2]
+        h = file_hash(pfad)
+        if eintrag and eintrag[2] == h:
+            _rules_cache[pfad] = (signatur, eintrag[1], h)
+            return eintrag[1], h
+        matching_df = _ohne_unnamed(pd.read_excel(pfad, sheet_name=0, dtype=str))
+        if "Default" not in matching_df.columns:
+            matching_df["Default"] = ""
+        _rules_cache[pfad] = (signatur, matching_df, h)
+        return matching_df, h
+
+
+class TopicMatcher:
+    """Aho-Corasick-Automat über alle Shortlist-Begriffe.
+
+    Die Begriffe werden einmal kleingeschrieben und kompiliert; danach kostet ein
+    Topic nur noch einen Durchlauf über seine Zeichen, unabhängig von der Anzahl
+    der Begriffe. Semantik wie bisher: Teilstring-Suche ohne Groß-/Kleinschreibung,
+    "immer" passt immer. Gemeldet wird der erste passende Begriff in der
+    Reihenfolge, in der die Begriffe übergeben wurden.
+    """
+
+    def __init__(self, terms):
+        self.terms = [str(t) for t in terms]
+        self._goto = [{}]
+        self._fail = [0]
+        self._best = [None]
+        self._leer = None
+
+        for prio, term in enumerate(self.terms):
+            muster = term.lower()
+            if not muster:
+                # "" ist in jedem Text enthalten
+                if self._leer is None:
+                    self._leer = prio
+                continue
+            knoten = 0
+            for zeichen in muster:
+                naechster = self._goto[knoten].get(zeichen)
+                if naechster is None:
+                    naechster = len(self._goto)
+                    self._goto[knoten][zeichen] = naechster
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._best.append(None)
+                knoten = naechster
+            if self._best[knoten] is None:
+                self._best[knoten] = prio
+
+        # Fehlerkanten per Breitensuche; _best erbt den besten Treffer der Fehlerkante
+        queue = deque(self._goto[0].values())
+        while queue:
+            knoten = queue.popleft()
+            for zeichen, kind in self._goto[knoten].items():
+                f = self._fail[knoten]
+                while f and zeichen not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[kind] = self._goto[f].get(zeichen, 0)
+                geerbt = self._best[self._fail[kind]]
+                if geerbt is not None and (self._best[kind] is None or geerbt < self._best[kind]):
+                    self._best[kind] = geerbt
+                queue.append(kind)
+
+    def _scan(self, text):
+        goto, fail, best = self._goto, self._fail, self._best
+        treffer = self._leer
+        knoten = 0
+        for zeichen in text:
+            while knoten and zeichen not in goto[knoten]:
+                knoten = fail[knoten]
+            knoten = goto[knoten].get(zeichen, 0)
+            prio = best[knoten]
+            if prio is not None and (treffer is None or prio < treffer):
+                treffer = prio
+                if treffer == 0:
+                    break
+        return treffer
+
+    def match(self, topic):
+        # Liefert den passenden Begriff, "immer" oder None
+        topic = str(topic).strip()
+        if topic.lower() == ALWAYS:
+            return ALWAYS
+        prio = self._scan(topic.lower())
+        return None if prio is None else self.terms[prio]
+
+    def match_column(self, topics):
+        # Gleiche Topics kommen in der Regeldatei oft vielfach vor: nur einmal scannen
+        cache = {}
+        result = []
+        for topic in topics:
+            key = str(topic)
+            if key not in cache:
+                cache[key] = self.match(key)
+            result.append(cache[key])
+        return result
+
+
+def shortlist_terms(shortlist_df):
+    # Reihenfolge wie bisher: erst Unter-Unterthemen, dann Unterthemen
+    unter_unterthemen = shortlist_df["Unter-Unterthema"].dropna().astype(str).unique()
+    unterthemen = shortlist_df["Unterthema"].dropna().astype(str).unique()
+    return list(unter_unterthemen) + list(unterthemen)
+
+def _text_spalte(df, spalte):
+    # Wie str(row.get(spalte, "")).strip(): fehlende Werte werden zu "nan"
+    if spalte not in df.columns:
+        return pd.Series("", index=df.index)
+    return pd.Series([str(v).strip() for v in df[spalte]], index=df.index)
+
+
+def split_matches(matching_df, treffer):
+    # Masken für unbedingte und bedingte Treffer
+    matched = pd.Series([t is not None for t in treffer], index=matching_df.index)
+    bedingt = _text_spalte(matching_df, "Bedingung").str.lower().eq("bedingt")
+    return matched & ~bedingt, matched & bedingt
+
+
+def default_answers(matching_df, mask):
+    # Vorbelegung aus der Spalte "Default"; alles außer Ja/Nein zählt als "Ja"
+    default = _text_spalte(matching_df, "Default")[mask].str.capitalize()
+    return default.where(default.isin(["Ja", "Nein"]), "Ja")
+
+
+def build_result(matching_df, mask):
+    result_df = _ohne_unnamed(matching_df[mask].dropna(how="all"))
+
+    mapped_df = result_df.rename(columns=SPALTEN_MAPPING)
+    mapped_df = mapped_df.loc[:, ~mapped_df.columns.duplicated()]
+    zielspalten = list(SPALTEN_MAPPING.values())
+    return mapped_df[[col for col in zielspalten if col in mapped_df.columns]]
+
+def apply_answers(matching_df, bedingt, antworten=None):
+    # Antworten je Id (z. B. aus einer Antwortdatei) überschreiben die Default-Spalte
+    answers = default_answers(matching_df, bedingt)
+    if antworten and "Id" in matching_df.columns:
+        ids = matching_df.loc[bedingt, "Id"].astype(str).str.strip()
+        override = ids.map(antworten)
+        answers = override.where(override.notna(), answers)
+    return answers
+
+
+def match_shortlist(matching_df, shortlist_df, antworten=None):
+    # Kompletter Matching-Lauf ohne Oberfläche, wie auf der Seite "Matching"
+    treffer = TopicMatcher(shortlist_terms(shortlist_df)).match_column(matching_df["Topic"])
+    unbedingt, bedingt = split_matches(matching_df, treffer)
+    answers = apply_answers(matching_df, bedingt, antworten)
+    mask = unbedingt | (bedingt & answers.reindex(matching_df.index).eq("Ja"))
+    return build_result(matching_df, mask)
\ No newline at end of file
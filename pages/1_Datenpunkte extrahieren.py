@@ -1,20 +1,33 @@
-import pandas as pd
 import streamlit as st
-import os
 from io import BytesIO
+import hashlib
 import json
-
-MASKEN_DATEI = "/Matching/masken.json"
-
-def lade_masken():
-    if not os.path.exists(MASKEN_DATEI):
-        return {}
-    with open(MASKEN_DATEI, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-def speichere_masken(masken):
-    with open(MASKEN_DATEI, "w", encoding="utf-8") as f:
-        json.dump(masken, f, indent=2, ensure_ascii=False)
+import os
+import tempfile
+from export import download_bereich
+from extraktion import (extrahiere, extrahiere_streaming, kopfzeilen, lade_masken, masken_index, passende_sheets,
+                        sheet_keyword_text, sheet_keywords, spalten_ermitteln, speichere_masken)
+
+# Alles hängt nur vom Inhalt der hochgeladenen Datei ab: Multiselect-Änderungen lesen nichts neu
+@st.cache_data(show_spinner=False, max_entries=5)
+def kopfzeilen_laden(datei_hash, _daten):
+    # Ein Durchgang über die Kopfzeilen aller Sheets für Maskenvorschlag und Spaltenauswahl
+    return kopfzeilen(BytesIO(_daten))
+
+@st.cache_data(show_spinner=False, max_entries=5)
+def daten_laden(datei_hash, _daten, sheets, spalten):
+    # Jedes Sheet in einem eigenen Prozess, soweit verfügbar
+    return extrahiere(_daten, sheets, spalten, workers=os.cpu_count() or 1)
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def streaming_laden(datei_hash, _daten, sheets, spalten):
+    with tempfile.SpooledTemporaryFile(max_size=STREAMING_AB_BYTES) as spool:
+        extrahiere_streaming(BytesIO(_daten), sheets, spalten, spool)
+        spool.seek(0)
+        return spool.read()
+
+# Ab dieser Größe wird standardmäßig zeilenweise extrahiert
+STREAMING_AB_BYTES = 20 * 1024 * 1024
 
 def process_excel():
     st.title("Excel-Daten Extraktion & Maskenverwaltung")
@@ -32,40 +45,58 @@ def process_excel():
         if not masken:
             st.warning("Keine Masken vorhanden. Bitte erstelle eine unter 'Neue Maske erstellen'.")
         else:
-            maske_name = st.selectbox("Wähle eine Maske", options=list(masken.keys()))
+            uploaded_file = st.file_uploader("Lade eine Excel-Datei hoch", type=["xls", "xlsx"])
+
+            optionen = list(masken.keys())
+            auswahl_index = 0
+            abdeckungen = {}
+            if uploaded_file:
+                try:
+                    daten = uploaded_file.getvalue()
+                    datei_hash = hashlib.sha256(daten).hexdigest()
+                    koepfe, kopf_fehler = kopfzeilen_laden(datei_hash, daten)
+                except Exception as e:
+                    st.error(f"Fehler beim Verarbeiten der Datei: {e}")
+                    return
+
+                # Alle Masken gegen Sheetnamen und Kopfzeilen bewerten, die beste vorauswählen
+                bewertung = masken_index().bewerte(koepfe)
+                abdeckungen = {name: abdeckung for name, abdeckung, _, _ in bewertung}
+                beste, abdeckung, gefunden, sheets = bewertung[0] if bewertung else (None, 0, 0, 0)
+                if beste in optionen and gefunden:
+                    auswahl_index = optionen.index(beste)
+                    st.info(f"Vorgeschlagene Maske: '{beste}' – {abdeckung:.0%} der Spalten gefunden in {sheets} Sheet(s)")
+                else:
+                    st.info("Keine Maske passt zu dieser Datei.")
+
+            maske_name = st.selectbox(
+                "Wähle eine Maske",
+                options=optionen,
+                index=auswahl_index,
+                format_func=lambda name: f"{name} ({abdeckungen[name]:.0%} Abdeckung)" if name in abdeckungen else name
+            )
             maske = masken[maske_name]
 
             sheet_keyword_raw = st.text_input(
                 "Suchbegriff(e) für Sheetnamen (mehrere durch Komma trennen, leer = alle Sheets)",
-                value=", ".join(maske.get("sheet_keyword", "").split(",") if isinstance(maske.get("sheet_keyword"), str) else maske.get("sheet_keyword", []))
+                value=sheet_keyword_text(maske)
             )
-            sheet_keywords = [kw.strip().lower() for kw in sheet_keyword_raw.split(",") if kw.strip()]
+            keywords = sheet_keywords(sheet_keyword_raw)
             default_columns = maske.get("columns", [])
 
-            uploaded_file = st.file_uploader("Lade eine Excel-Datei hoch", type=["xls", "xlsx"])
-
             if uploaded_file:
                 try:
-                    xls = pd.ExcelFile(uploaded_file)
-                    if sheet_keywords:
-                        matching_sheets = [s for s in xls.sheet_names if any(kw in s.lower() for kw in sheet_keywords)]
-                    else:
-                        matching_sheets = xls.sheet_names 
+                    matching_sheets = passende_sheets(list(koepfe), keywords)
 
                     if not matching_sheets:
                         st.warning("Keine passenden Sheets gefunden.")
                         return
 
                     st.write(f"Gefundene Sheets: {', '.join(matching_sheets)}")
-                    all_columns_set = set()
+                    all_columns = spalten_ermitteln(koepfe, matching_sheets)
                     for sheet in matching_sheets:
-                        try:
-                            df_temp = pd.read_excel(xls, sheet_name=sheet, skiprows=1)
-                            all_columns_set.update(df_temp.columns.tolist())
-                        except Exception as e:
-                            st.warning(f"Fehler beim Einlesen von Sheet '{sheet}': {e}")
-
-                    all_columns = list(all_columns_set)
+                        if sheet in kopf_fehler:
+                            st.warning(f"Fehler beim Einlesen von Sheet '{sheet}': {kopf_fehler[sheet]}")
 
                     selected_columns = st.multiselect(
                         "Wähle Spalten aus der Datei",
@@ -79,34 +110,36 @@ def process_excel():
                     additional_columns = [col.strip() for col in additional_columns_raw.split(",") if col.strip()]
                     all_selected_columns = list(dict.fromkeys(selected_columns + additional_columns))
 
+                    streaming = st.checkbox(
+                        "Speicherschonend extrahieren (für sehr große Dateien, nur .xlsx)",
+                        value=len(daten) >= STREAMING_AB_BYTES and not uploaded_file.name.lower().endswith(".xls")
+                    )
+
+                    # Das Ergebnis bleibt sichtbar, solange Datei und Auswahl gleich bleiben (z. B. beim Formatwechsel)
+                    auftrag = (datei_hash, tuple(matching_sheets), tuple(all_selected_columns), streaming)
                     if st.button("Daten extrahieren"):
                         if not all_selected_columns:
                             st.warning("Bitte wähle oder gib mindestens eine Spalte an.")
                             return
-
-                        extracted_data = []
-                        for sheet in matching_sheets:
-                            df = pd.read_excel(xls, sheet_name=sheet, skiprows=1)
-                            df_filtered = df[[col for col in all_selected_columns if col in df.columns]]
-                            extracted_data.append(df_filtered)
-
-                        final_df = pd.concat(extracted_data, ignore_index=True)
-
-                        # Leere Zeilen entfernen
-                        final_df.dropna(how="all", inplace=True)
-                        output = BytesIO()
-                        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                            final_df.to_excel(writer, sheet_name='Gefilterte_Daten', index=False)
-                        output.seek(0)
-
-                        st.success("Daten erfolgreich extrahiert!")
-
-                        st.download_button(
-                            label="Download gefilterte Excel-Datei",
-                            data=output,
-                            file_name="gefilterte_daten.xlsx",
-                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                        )
+                        st.session_state["extraktion_auftrag"] = auftrag
+
+                    if st.session_state.get("extraktion_auftrag") == auftrag:
+                        if streaming:
+                            # Zeilenweise lesen und schreiben, ohne DataFrames im Speicher; nur als xlsx
+                            output = streaming_laden(datei_hash, daten, matching_sheets, all_selected_columns)
+                            st.success("Daten erfolgreich extrahiert!")
+                            st.download_button(
+                                label="Download gefilterte Excel-Datei",
+                                data=output,
+                                file_name="gefilterte_daten.xlsx",
+                                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                            )
+                        else:
+                            final_df, fehler = daten_laden(datei_hash, daten, matching_sheets, all_selected_columns)
+                            for sheet, e in fehler.items():
+                                st.warning(f"Fehler beim Einlesen von Sheet '{sheet}': {e}")
+                            st.success("Daten erfolgreich extrahiert!")
+                            download_bereich(final_df, "gefilterte_daten", sheet_name="Gefilterte_Daten", key="extraktion_export")
                 except Exception as e:
                     st.error(f"Fehler beim Verarbeiten der Datei: {e}")
 
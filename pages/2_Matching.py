@@ -1,111 +1,105 @@
 import streamlit as st
 import pandas as pd
+import hashlib
 from io import BytesIO
+from export import download_bereich
+from matching import (MATCHING_DATEI, ShortlistError, TopicMatcher, build_result, default_answers, load_rules,
+                      read_shortlist, shortlist_terms, split_matches)
+
+# Shortlist und Treffer hängen nur vom Inhalt der Dateien ab
+@st.cache_data(show_spinner=False)
+def shortlist_laden(upload_hash, _daten):
+    return read_shortlist(BytesIO(_daten))
+
+@st.cache_data(show_spinner=False)
+def treffer_berechnen(rules_hash, upload_hash, _matching_df, _shortlist_df):
+    matcher = TopicMatcher(shortlist_terms(_shortlist_df))
+    treffer = matcher.match_column(_matching_df["Topic"])
+    unbedingt, bedingt = split_matches(_matching_df, treffer)
+    # Ergebnis für alle Treffer einmal aufbauen; Bedingungen filtern später nur noch Zeilen
+    basis_df = build_result(_matching_df, unbedingt | bedingt)
+    return treffer, bedingt, basis_df
+
+@st.fragment
+def bedingungen_bestaetigen(matching_df, bedingt, basis_df, cache_key):
+    # Nur dieses Fragment läuft neu, wenn Bedingungen umgeschaltet werden
+    st.subheader(" Bedingungen bestätigen")
+    abgelehnt = pd.Index([])
+    if bedingt.any():
+        bedingungen_df = pd.DataFrame({
+            "Zeile": matching_df.index[bedingt] + 2,
+            "Bemerkung": matching_df.loc[bedingt, "Bemerkung"].fillna("") if "Bemerkung" in matching_df.columns else "",
+            "Antwort": default_answers(matching_df, bedingt)
+        }, index=matching_df.index[bedingt])
+
+        # Sammelaktionen setzen alle Antworten und starten den Editor neu
+        editor_key = f"bedingungen_{cache_key}"
+        zustand = st.session_state.setdefault(editor_key, {"alle": None, "version": 0})
+        col_ja, col_nein, col_reset = st.columns(3)
+        for spalte, label, wert in ((col_ja, "Alle Ja", "Ja"), (col_nein, "Alle Nein", "Nein"), (col_reset, "Standardwerte", None)):
+            if spalte.button(label):
+                zustand["alle"] = wert
+                zustand["version"] += 1
+        if zustand["alle"]:
+            bedingungen_df["Antwort"] = zustand["alle"]
+
+        bearbeitet = st.data_editor(
+            bedingungen_df,
+            column_config={
+                "Antwort": st.column_config.SelectboxColumn("Antwort", options=["Ja", "Nein"], required=True)
+            },
+            disabled=["Zeile", "Bemerkung"],
+            hide_index=True,
+            use_container_width=True,
+            key=f"{editor_key}_{zustand['version']}"
+        )
+        abgelehnt = bearbeitet.index[bearbeitet["Antwort"] != "Ja"]
+    else:
+        st.write("Keine bedingten Datenpunkte.")
+
+    mapped_df = basis_df[~basis_df.index.isin(abgelehnt)]
+    if mapped_df.empty:
+        st.info("ℹ Keine passenden Zeilen gefunden oder alle Bedingungen wurden abgelehnt.")
+        return
+
+    #  Bereitstellen als Download, erst auf Anforderung serialisieren
+    download_bereich(mapped_df, "Ergebnis_Matching", sheet_name="Matched", key="matching_export", auf_anforderung=True)
 
 def run_excel_matcher():
-    matching_datei = "/Matching/Matching.xlsx"
     st.set_page_config(page_title="Excel Topic Matcher", layout="wide")
     st.title(" Excel Topic Matcher")
 
     uploaded_file = st.file_uploader(" Ziehe eine Shortlist Excel-Datei hierher", type=["xlsx"])
 
     try:
-        matching_df = pd.read_excel(matching_datei, sheet_name=0, dtype=str)
-        matching_df = matching_df.loc[:, ~matching_df.columns.str.contains("^Unnamed")]
+        # Regeldatei wird prozessweit nach Dateihash zwischengespeichert
+        matching_df, rules_hash = load_rules(MATCHING_DATEI)
     except FileNotFoundError:
         st.error(" Die Datei 'Matching.xlsx' wurde nicht gefunden.")
         return
 
     if uploaded_file:
+        daten = uploaded_file.getvalue()
+        upload_hash = hashlib.sha256(daten).hexdigest()
         try:
-            excel_file = pd.ExcelFile(uploaded_file)
-            if "Shortlist" not in excel_file.sheet_names:
-                st.error(" Die hochgeladene Excel-Datei enthält kein Blatt namens 'Shortlist'.")
-                return
-            shortlist_df = excel_file.parse("Shortlist", dtype=str)
-            shortlist_df = shortlist_df.loc[:, ~shortlist_df.columns.str.contains("^Unnamed")]
+            shortlist_df = shortlist_laden(upload_hash, daten)
+        except ShortlistError as e:
+            st.error(str(e))
+            return
         except Exception as e:
             st.error(f" Fehler beim Lesen der Excel-Datei: {e}")
             return
 
-        required_columns = ["Unter-Unterthema", "Unterthema"]
-        if not all(col in shortlist_df.columns for col in required_columns):
-            st.error(" Die Shortlist-Datei muss die Spalten 'Unter-Unterthema' und 'Unterthema' enthalten.")
-            return
-
         if "Topic" not in matching_df.columns:
             st.error(" Die Matching-Datei muss eine Spalte 'Topic' enthalten.")
             return
 
-        if "Default" not in matching_df.columns:
-            matching_df["Default"] = ""
-
-        matched_rows = []
-
-        unter_unterthemen = shortlist_df["Unter-Unterthema"].dropna().astype(str).unique()
-        unterthemen = shortlist_df["Unterthema"].dropna().astype(str).unique()
-
-        def topic_matches(topic_str):
-            if str(topic_str).strip().lower() == "immer":
-                return True
-            topic_str = str(topic_str).lower()
-            return any(t.lower() in topic_str for t in unter_unterthemen) or \
-                   any(t.lower() in topic_str for t in unterthemen)
-
-        st.subheader(" Bedingungen bestätigen")
-        for idx, row in matching_df.iterrows():
-            topic = str(row.get("Topic", "")).strip()
-            condition = str(row.get("Bedingung", "")).strip()
-            note = str(row.get("Bemerkung", "")).strip()
-
-            if topic_matches(topic):
-                if condition.lower() == "bedingt":
-                    default_value = str(row.get("Default", "Ja")).strip().capitalize()
-                    default_value = default_value if default_value in ("Ja", "Nein") else "Ja"
-                    user_input = st.radio(
-                        f" {note} (Zeile {idx+2})",
-                        ("Ja", "Nein"),
-                        index=0 if default_value == "Ja" else 1,
-                        key=f"bedingung_{idx}"
-                    )
-                    matching_df.at[idx, "Default"] = user_input
-                    if user_input == "Ja":
-                        matched_rows.append(row)
-                else:
-                    matching_df.at[idx, "Default"] = ""
-                    matched_rows.append(row)
-
-        if not matched_rows:
-            st.info("ℹ Keine passenden Zeilen gefunden oder alle Bedingungen wurden abgelehnt.")
-            return
-
-        result_df = pd.DataFrame(matched_rows).dropna(how="all")
-        result_df = result_df.loc[:, ~result_df.columns.str.contains("^Unnamed")]
-
-        # Spalten-Mapping
-        spalten_mapping = {
-            "Id": "Id",
-            "DR": "Regelwerk",
-            "Paragraph": "Paragraph",
-            "Name": "Name",
-            "Datentyp": "Datentyp",
-            "Topic": "Gruppe"
-        }
+        # Alle Begriffe einmal kompilieren und die Topic-Spalte in einem Durchgang prüfen
+        treffer, bedingt, basis_df = treffer_berechnen(rules_hash, upload_hash, matching_df, shortlist_df)
 
-        mapped_df = result_df.rename(columns=spalten_mapping)
-        mapped_df = mapped_df.loc[:, ~mapped_df.columns.duplicated()]
-        zielspalten = list(spalten_mapping.values())
-        mapped_df = mapped_df[[col for col in zielspalten if col in mapped_df.columns]]
+        with st.expander(f" Treffer je Zeile ({sum(t is not None for t in treffer)} von {len(treffer)})"):
+            treffer_df = matching_df.assign(Treffer=treffer)
+            st.dataframe(treffer_df[treffer_df["Treffer"].notna()][[c for c in ("Id", "Topic", "Treffer") if c in treffer_df.columns]])
 
-        #  Bereitstellen als Download 
-        excel_buffer = BytesIO()
-        with pd.ExcelWriter(excel_buffer, engine="openpyxl") as writer:
-            mapped_df.to_excel(writer, index=False, sheet_name="Matched")
-
-        st.download_button(
-            label=" Ergebnis herunterladen",
-            data=excel_buffer.getvalue(),
-            file_name="Ergebnis_Matching.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
+        bedingungen_bestaetigen(matching_df, bedingt, basis_df, f"{rules_hash[:12]}_{upload_hash[:12]}")
 run_excel_matcher()
\ No newline at end of file
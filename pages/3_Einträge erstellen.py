@@ -1,28 +1,23 @@
 import streamlit as st
 import pandas as pd
+from datenmodell import DATA_FILE, get_store
+from massenimport import IMPORT_ATTRIBUTE, datenpunkte_importieren, paragrafen_zuordnen
+from suchindex import such_index
 
 st.set_page_config(
     layout="wide",           # Nutzt die volle Breite der Seite
     page_title="Einträge erstellen",  # Optional: Titel des Browser-Tabs
 )
-# Lade die Excel-Tabelle
-DATA_FILE = "/Matching/Datenmodell.xlsx"
+# Gemeinsamer Cache der Excel-Tabelle (siehe datenmodell.py)
+store = get_store(DATA_FILE)
 
 def load_data():
-    xls = pd.ExcelFile(DATA_FILE)
-    return {sheet: xls.parse(sheet) for sheet in xls.sheet_names}
+    return store.load()
 
-def save_data(sheet_name, df):
-    # Bestehende Daten aus Datei laden
-    existing_data = load_data()
-
-    # Sheet aktualisieren
-    existing_data[sheet_name] = df
-
-    # Alles neu schreiben (jedes Sheet nacheinander)
-    with pd.ExcelWriter(DATA_FILE, engine='openpyxl', mode='w') as writer:
-        for sheet, data in existing_data.items():
-            data.to_excel(writer, sheet_name=sheet, index=False)
+def append_data(sheet_name, rows):
+    # Nur die neuen Zeilen übergeben (bei SQLite ein einzelnes INSERT)
+    with store.transaction() as tx:
+        tx.append(sheet_name, rows)
 
 
 
@@ -51,20 +46,17 @@ def eintraege():
             if not name.strip():
                 st.error(" Bitte gib einen Namen für das Regelwerk ein.")
             else:
-                next_id = regelwerke_df["Regelwerk-ID"].max() + 1 if not regelwerke_df.empty else 1
+                next_id = store.reserviere_ids("Regelwerk")
 
                 # Neue Zeile mit exakten Spaltennamen
                 new_row = pd.DataFrame([[next_id, name.strip()]], columns=["Regelwerk-ID", "Name"])
 
-                # Anhängen an bestehende Regelwerke
-                regelwerke_df = pd.concat([regelwerke_df, new_row], ignore_index=True)
-
-                # Speichern 
-                save_data("Regelwerk", regelwerke_df)
+                # Anhängen an bestehende Regelwerke und speichern
+                append_data("Regelwerk", new_row)
 
                 st.success(f" Regelwerk '{name}' wurde gespeichert.")
                 #  Reload nach Speichern
-                regelwerke_df = pd.read_excel("/Matching/Datenmodell.xlsx", sheet_name="Regelwerk")
+                regelwerke_df = store.sheet("Regelwerk")
         # Anzeige bestehender Regelwerke
         st.subheader(" Bestehende Regelwerke")
         if not regelwerke_df.empty:
@@ -80,9 +72,6 @@ def eintraege():
         stakeholders = data.get("Stakeholder", pd.DataFrame())
         stakeholders.columns = stakeholders.columns.str.strip()  
 
-        # Neue ID berechnen
-        new_id = stakeholders["Stakeholder-ID"].max() + 1 if not stakeholders.empty else 1
-
         # Eingabefelder
         name = st.text_input("Name des Stakeholders")
         branche = st.text_input("Branche")
@@ -91,16 +80,16 @@ def eintraege():
             if not name.strip():
                 st.error("Bitte gib einen Namen für den Stakeholder ein.")
             else:
+                new_id = store.reserviere_ids("Stakeholder")
                 new_entry = pd.DataFrame([{
                     "Stakeholder-ID": new_id,
                     "Name": name.strip(),
                     "Branche": branche.strip()
                 }])
-                updated_df = pd.concat([stakeholders, new_entry], ignore_index=True)
-                save_data("Stakeholder", updated_df)
+                append_data("Stakeholder", new_entry)
                 st.success(f" Stakeholder '{name}' gespeichert mit ID {new_id}.")
                 #  Neu einlesen
-                stakeholders = pd.read_excel("/Matching/Datenmodell.xlsx", sheet_name="Stakeholder")
+                stakeholders = store.sheet("Stakeholder")
         # Bestehende Stakeholder anzeigen + Suchfeld
         st.subheader(" Bestehende Stakeholder")
 
@@ -109,9 +98,7 @@ def eintraege():
         else:
             search = st.text_input(" Suche nach Name")
 
-            filtered_df = stakeholders[
-                stakeholders["Name"].astype(str).str.contains(search, case=False, na=False)
-            ] if search else stakeholders
+            filtered_df = such_index(store).filter(stakeholders, "Stakeholder", search, ["Name"])
 
             st.dataframe(filtered_df[["Stakeholder-ID", "Name", "Branche"]])
 
@@ -168,61 +155,41 @@ def eintraege():
                         col_standard = st.selectbox("Spalte für Standard", col_names)
                         col_paragraf = st.selectbox("Spalte für Paragraf", col_names)
 
-                        all_mapped = all([col_dp_name, col_datentyp, col_gruppe, col_standard, col_paragraf])
-                        if not all_mapped:
-                            st.error(" Bitte alle Felder für die Zuordnung der Spalten korrekt auswählen.")
+                        spalten = dict(zip(IMPORT_ATTRIBUTE, [col_dp_name, col_datentyp, col_gruppe, col_standard, col_paragraf]))
+                        if len(set(spalten.values())) < len(spalten):
+                            st.warning(" Mehrere Attribute sind derselben Spalte zugeordnet.")
+
+                        # Prüfen und planen ohne zu schreiben; vorhandene Datenpunkte werden wiederverwendet.
+                        # Für die Vorschau nur die nächsten freien IDs ansehen, reserviert wird erst beim Import
+                        modell = {"Datenpunkt": datenpunkte_df, "Paragraf": paragraf_df,
+                                  "Regelwerk-Datenpunkt": rw_dp_df, "Stakeholder-Datenpunkt": sh_dp_df}
+                        neue, pruefung = datenpunkte_importieren(df, spalten, modell, regelwerk_id, stakeholder_id,
+                                                                 store.reserviere_ids("Datenpunkt", 0),
+                                                                 store.reserviere_ids("Paragraf", 0))
+
+                        st.markdown("###  Prüfung")
+                        st.dataframe(
+                            pd.DataFrame({"Prüfung": list(pruefung), "Anzahl": list(pruefung.values())}),
+                            hide_index=True
+                        )
+                        if pruefung["Leer: Name"]:
+                            st.warning(f" {pruefung['Leer: Name']} Zeilen ohne Datenpunkt-Namen werden übersprungen.")
+
+                        if all(neu.empty for neu in neue.values()):
+                            st.info(" Es wurden keine neuen Einträge erkannt.")
                         elif st.button("Datenpunkte und Paragrafen importieren"):
-                            next_dp_id = datenpunkte_df["Datenpunkt-ID"].max() + 1 if not datenpunkte_df.empty else 1
-                            next_pg_id = paragraf_df["Paragraf-ID"].max() + 1 if not paragraf_df.empty else 1
-
-                            dp_list, pg_list, rw_dp_list, sh_dp_list = [], [], [], []
-
-                            for _, row in df.iterrows():
-                                dp_id = next_dp_id
-                                next_dp_id += 1
-
-                                dp_list.append({
-                                    "Datenpunkt-ID": dp_id,
-                                    "Name": row[col_dp_name],  # Wichtig: "Name", nicht "Namen"
-                                    "Datentyp": row[col_datentyp],
-                                    "Gruppe": row[col_gruppe]
-                                })
-
-                                pg_list.append({
-                                    "Paragraf-ID": next_pg_id,
-                                    "Regelwerk-ID": regelwerk_id,
-                                    "Datenpunkt-ID": dp_id,
-                                    "Standard": row[col_standard],
-                                    "Paragraf": row[col_paragraf]
-                                })
-                                next_pg_id += 1
-
-                                rw_dp_list.append({"Regelwerk-ID": regelwerk_id, "Datenpunkt-ID": dp_id})
-                                sh_dp_list.append({"Stakeholder-ID": stakeholder_id, "Datenpunkt-ID": dp_id})
-
-                            # Tabellen aktualisieren
-                            updated_dp = pd.concat([datenpunkte_df, pd.DataFrame(dp_list)], ignore_index=True)
-                            updated_pg = pd.concat([paragraf_df, pd.DataFrame(pg_list)], ignore_index=True)
-                            # Neue DataFrames
-                            new_rw_dp_df = pd.DataFrame(rw_dp_list)
-                            new_sh_dp_df = pd.DataFrame(sh_dp_list)
-
-                            # Nur neue Regelwerk-Datenpunkt-Kombinationen, die noch nicht existieren
-                            merged_rw = new_rw_dp_df.merge(rw_dp_df, on=["Regelwerk-ID", "Datenpunkt-ID"], how="left", indicator=True)
-                            new_rw_only = merged_rw[merged_rw["_merge"] == "left_only"].drop(columns=["_merge"])
-                            updated_rw_dp = pd.concat([rw_dp_df, new_rw_only], ignore_index=True)
-
-                            # Nur neue Stakeholder-Datenpunkt-Kombinationen, die noch nicht existieren
-                            merged_sh = new_sh_dp_df.merge(sh_dp_df, on=["Stakeholder-ID", "Datenpunkt-ID"], how="left", indicator=True)
-                            new_sh_only = merged_sh[merged_sh["_merge"] == "left_only"].drop(columns=["_merge"])
-                            updated_sh_dp = pd.concat([sh_dp_df, new_sh_only], ignore_index=True)
-
-                            save_data("Datenpunkt", updated_dp)
-                            save_data("Paragraf", updated_pg)
-                            save_data("Regelwerk-Datenpunkt", updated_rw_dp)
-                            save_data("Stakeholder-Datenpunkt", updated_sh_dp)
-
-                            st.success(" Datenpunkte und Paragrafen erfolgreich importiert.")
+                            # Beide ID-Bereiche in je einem Aufruf reservieren und damit endgültig planen
+                            neue, _ = datenpunkte_importieren(
+                                df, spalten, modell, regelwerk_id, stakeholder_id,
+                                store.reserviere_ids("Datenpunkt", len(neue["Datenpunkt"])),
+                                store.reserviere_ids("Paragraf", len(neue["Paragraf"]))
+                            )
+                            # Alle vier Sheets in einem Schreibvorgang speichern, nur die neuen Zeilen
+                            with store.transaction() as tx:
+                                for sheet, neu in neue.items():
+                                    tx.append(sheet, neu)
+
+                            st.success(f" {len(neue['Datenpunkt'])} Datenpunkte und {len(neue['Paragraf'])} Paragrafen erfolgreich importiert.")
                 except Exception as e:
                     st.error(f" Fehler beim Verarbeiten der Datei: {e}")
 
@@ -258,11 +225,7 @@ def eintraege():
             land = st.text_input("Land")
 
             if st.button("Standort speichern"):
-                #  Daten neu laden, um aktuelle ID zu berechnen
-                current_data = load_data()
-                standorte = current_data["Standort"]
-
-                new_id = standorte["Standort-ID"].max() + 1 if not standorte.empty else 1
+                new_id = store.reserviere_ids("Standort")
 
                 new_entry = pd.DataFrame([{
                     "Standort-ID": new_id,
@@ -273,8 +236,7 @@ def eintraege():
                     "Stakeholder-ID": stakeholder_id
                 }])
 
-                updated_df = pd.concat([standorte, new_entry], ignore_index=True)
-                save_data("Standort", updated_df)
+                append_data("Standort", new_entry)
 
                 st.success(f" Standort erfolgreich gespeichert mit ID {new_id}.")
                 st.rerun()
@@ -286,11 +248,7 @@ def eintraege():
             st.markdown("###  Aktuelle Standorte")
 
             search = st.text_input(" Standortsuche (PLZ, Straße, Land, etc.)")
-            filtered = standorte.copy()
-
-            if search:
-                search_lower = search.lower()
-                filtered = standorte[standorte.apply(lambda row: search_lower in str(row).lower(), axis=1)]
+            filtered = such_index(store).filter(standorte, "Standort", search)
 
             st.dataframe(filtered, use_container_width=True)
     # TAB 5: Weitere Standards verknüpfen (flexibles Mapping)
@@ -333,63 +291,30 @@ def eintraege():
                         st.session_state["run_mapping"] = True
 
                     if st.session_state.get("run_mapping"):
-                        next_pg_id = paragraf_df["Paragraf-ID"].max() + 1 if not paragraf_df.empty else 1
-                        new_paragraphs = []
-                        new_rw_dp_links = []
-
-                        for _, row in df.iterrows():
-                            referenzwert = row[alte_pg_spalte]
-
-                            if mapping_basis == "Paragraf-ID":
-                                try:
-                                    referenzwert = int(str(referenzwert).strip())
-                                    matching_pg = paragraf_df[paragraf_df["Paragraf-ID"] == referenzwert]
-                                except:
-                                    st.warning(f" Ungültiger Wert in '{alte_pg_spalte}': {referenzwert}")
-                                    continue
-                            else:  
-                                referenzwert = str(referenzwert).strip()
-                                matching_pg = paragraf_df[paragraf_df["Paragraf"].str.strip() == referenzwert]
-
-                            if matching_pg.empty:
-                                st.warning(f" Kein passender Paragraf gefunden für: {referenzwert}")
-                                continue
-
-                            datenpunkt_id = matching_pg.iloc[0]["Datenpunkt-ID"]
-
-                            new_paragraphs.append({
-                                "Paragraf-ID": next_pg_id,
-                                "Regelwerk-ID": ziel_regelwerk_id,
-                                "Datenpunkt-ID": datenpunkt_id,
-                                "Standard": row[neue_standard_spalte],
-                                "Paragraf": row[neuer_pg_text_spalte]
-                            })
-
-                            exists = rw_dp_df[
-                                (rw_dp_df["Regelwerk-ID"] == ziel_regelwerk_id) &
-                                (rw_dp_df["Datenpunkt-ID"] == datenpunkt_id)
-                            ]
-                            if exists.empty:
-                                new_rw_dp_links.append({
-                                    "Regelwerk-ID": ziel_regelwerk_id,
-                                    "Datenpunkt-ID": datenpunkt_id
-                                })
-
-                            next_pg_id += 1
-
-                        if new_paragraphs:
-                            paragraf_df_updated = pd.concat([paragraf_df, pd.DataFrame(new_paragraphs)], ignore_index=True)
-                            save_data("Paragraf", paragraf_df_updated)
+                        # Die ganze Datei in einem Join gegen die Paragrafen des Datenmodells zuordnen
+                        new_paragraphs, new_rw_dp_links, nicht_zugeordnet = paragrafen_zuordnen(
+                            df, paragraf_df, rw_dp_df, mapping_basis, alte_pg_spalte,
+                            neue_standard_spalte, neuer_pg_text_spalte, ziel_regelwerk_id
+                        )
+                        erste_id = store.reserviere_ids("Paragraf", len(new_paragraphs))
+                        new_paragraphs.insert(0, "Paragraf-ID", range(erste_id, erste_id + len(new_paragraphs)))
+
+                        with store.transaction() as tx:
+                            tx.append("Paragraf", new_paragraphs)
+                            tx.append("Regelwerk-Datenpunkt", new_rw_dp_links)
+
+                        if not new_paragraphs.empty:
                             st.success(f" {len(new_paragraphs)} neue Paragrafen hinzugefügt.")
-
-                        if new_rw_dp_links:
-                            rw_dp_df_updated = pd.concat([rw_dp_df, pd.DataFrame(new_rw_dp_links)], ignore_index=True)
-                            save_data("Regelwerk-Datenpunkt", rw_dp_df_updated)
+                        if not new_rw_dp_links.empty:
                             st.success(f" {len(new_rw_dp_links)} neue Regelwerk-Datenpunkt-Verknüpfungen gespeichert.")
 
-                        if not new_paragraphs and not new_rw_dp_links:
+                        if new_paragraphs.empty and new_rw_dp_links.empty:
                             st.info(" Es wurden keine neuen Einträge erkannt.")
 
+                        if not nicht_zugeordnet.empty:
+                            st.warning(f" {len(nicht_zugeordnet)} Zeilen konnten keinem Paragrafen zugeordnet werden.")
+                            st.dataframe(nicht_zugeordnet, hide_index=True)
+
                         st.session_state["run_mapping"] = False
 
                 except Exception as e:
@@ -413,7 +338,7 @@ def eintraege():
         # DATENPUNKT SUCHEN
         st.subheader(" Datenpunkt auswählen")
         dp_suchbegriff = st.text_input("Datenpunktname suchen")
-        gefundene_dp = datenpunkt_df[datenpunkt_df["Name"].astype(str).str.contains(dp_suchbegriff, case=False, na=False)] if dp_suchbegriff else datenpunkt_df
+        gefundene_dp = such_index(store).filter(datenpunkt_df, "Datenpunkt", dp_suchbegriff, ["Name"])
 
         if not gefundene_dp.empty:
             dp_name = st.selectbox("Gefundene Datenpunkte:", gefundene_dp["Name"])
@@ -432,14 +357,14 @@ def eintraege():
 
             st.markdown("#### Stakeholder auswählen")
             stakeholder_suchbegriff = st.text_input("Stakeholdername suchen")
-            gefundene_stk = stakeholder_df[stakeholder_df["Name"].astype(str).str.contains(stakeholder_suchbegriff, case=False, na=False)] if stakeholder_suchbegriff else stakeholder_df
+            gefundene_stk = such_index(store).filter(stakeholder_df, "Stakeholder", stakeholder_suchbegriff, ["Name"])
 
             if not gefundene_stk.empty:
                 stk_name = st.selectbox("Gefundene Stakeholder:", gefundene_stk["Name"])
                 stakeholder_id = stakeholder_df[stakeholder_df["Name"] == stk_name]["Stakeholder-ID"].values[0]
 
                 if st.button(" Kennzahl hinzufügen"):
-                    neue_id = kennzahl_df["Kennzahl-ID"].max() + 1 if not kennzahl_df.empty else 1
+                    neue_id = store.reserviere_ids("Kennzahl")
 
                     neue_kennzahl = {
                         "Kennzahl-ID": neue_id,
@@ -451,8 +376,8 @@ def eintraege():
                     }
 
                     try:
-                        kennzahl_df_updated = pd.concat([kennzahl_df, pd.DataFrame([neue_kennzahl])], ignore_index=True)
-                        save_data("Kennzahl", kennzahl_df_updated)
+                        with store.transaction() as tx:
+                            tx.append("Kennzahl", [neue_kennzahl])
                         st.success(" Kennzahl erfolgreich hinzugefügt.")
                     except PermissionError:
                         st.error(" Fehler beim Speichern. Bitte schließen Sie die Excel-Datei und versuchen Sie es erneut.")
@@ -1,19 +1,29 @@
 import pandas as pd
 import streamlit as st
 from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode, DataReturnMode
+from datenmodell import get_store
+from kennzahlen import kennzahlen
+from suchindex import such_index
+from tabellenansicht import seitenfenster
+
+def grid_optionen(df, selection=False):
+    gb = GridOptionsBuilder.from_dataframe(df)
+    # Sortiert und gefiltert wird über alle Zeilen in pandas, nicht nur auf der sichtbaren Seite
+    gb.configure_default_column(sortable=False, filter=False)
+    if selection:
+        gb.configure_selection("single", use_checkbox=False)
+    return gb.build()
 
 def display_data_model(excel_file_path):
     try:
-        # Excel einlesen
-        xls = pd.ExcelFile(excel_file_path)
-        data = {sheet: xls.parse(sheet).fillna("") for sheet in xls.sheet_names}
-
-        # Tabellen extrahieren
-        dp_df = data.get("Datenpunkt", pd.DataFrame())
-        kennzahlen_df = data.get("Kennzahl", pd.DataFrame())
-        regelwerk_df = data.get("Regelwerk", pd.DataFrame())
-        stakeholder_df = data.get("Stakeholder", pd.DataFrame())
-        regelwerk_dp_df = data.get("Regelwerk-Datenpunkt", pd.DataFrame())
+        # Nur die benötigten Tabellen aus dem gemeinsamen Cache holen
+        store = get_store(excel_file_path)
+        dp_df = store.sheet("Datenpunkt")
+        # Kennzahlen nur über den Index nach (Datenpunkt, Stakeholder, Jahr), ohne das Sheet zu kopieren
+        kz_index = kennzahlen(store)
+        regelwerk_df = store.sheet("Regelwerk")
+        stakeholder_df = store.sheet("Stakeholder")
+        regelwerk_dp_df = store.sheet("Regelwerk-Datenpunkt")
 
         if dp_df.empty:
             st.warning(" Keine Datenpunkte gefunden.")
@@ -35,15 +45,13 @@ def display_data_model(excel_file_path):
             selected_gruppe = st.selectbox(" Gruppe", gruppen_options)
 
         # Filterlogik
-        filtered_dp_df = dp_df.copy()
+        filtered_dp_df = dp_df
 
-        if selected_stakeholder != "Alle" and not stakeholder_df.empty and not kennzahlen_df.empty:
+        if selected_stakeholder != "Alle" and not stakeholder_df.empty:
             match = stakeholder_df[stakeholder_df["Name"] == selected_stakeholder]
             if not match.empty:
                 stakeholder_id = match.iloc[0]["Stakeholder-ID"]
-                relevant_dp_ids = kennzahlen_df[
-                    kennzahlen_df["Stakeholder-ID"] == stakeholder_id
-                ]["Datenpunkt-ID"].unique()
+                relevant_dp_ids = kz_index.datenpunkte_von(stakeholder_id)
                 filtered_dp_df = filtered_dp_df[filtered_dp_df["Datenpunkt-ID"].isin(relevant_dp_ids)]
 
         if selected_regelwerk != "Alle" and not regelwerk_df.empty and not regelwerk_dp_df.empty:
@@ -60,22 +68,21 @@ def display_data_model(excel_file_path):
 
         st.subheader(" Gefilterte Datenpunkte")
 
-        # Haupttabelle
-        gb = GridOptionsBuilder.from_dataframe(filtered_dp_df)
-        gb.configure_selection("single", use_checkbox=False)
-        grid_options = gb.build()
-
+        # Haupttabelle: nur die aktuelle Seite wird an den Browser geschickt
+        fenster_df, ansicht = seitenfenster(filtered_dp_df, "dp", such_index(store), "Datenpunkt")
         grid_response = AgGrid(
-            filtered_dp_df,
-            gridOptions=grid_options,
+            fenster_df,
+            gridOptions=grid_optionen(fenster_df, selection=True),
             update_mode=GridUpdateMode.SELECTION_CHANGED,
             data_return_mode=DataReturnMode.FILTERED_AND_SORTED,
             theme="streamlit",
             fit_columns_on_grid_load=True,
-            domLayout="autoHeight"
+            domLayout="autoHeight",
+            # Die Runde wechselt bei "Auswahl aufheben", damit das Grid seine Markierung vergisst
+            key=f"dp_grid_{hash((selected_regelwerk, selected_stakeholder, selected_gruppe, st.session_state.get('dp_grid_runde', 0)) + ansicht)}"
         )
 
-        # Selektion verarbeiten
+        # Selektion verarbeiten; sie bleibt beim Blättern erhalten
         raw_selection = grid_response.get("selected_rows", None)
 
         if raw_selection is None:
@@ -87,6 +94,25 @@ def display_data_model(excel_file_path):
         else:
             selected = []
 
+        if selected:
+            st.session_state["dp_auswahl"] = selected
+        else:
+            selected = st.session_state.get("dp_auswahl", [])
+
+        # Gespeicherte Auswahl verwerfen, wenn der Datenpunkt ausgefiltert oder gelöscht wurde
+        if selected:
+            auswahl_id = selected[0].get("Datenpunkt-ID") if isinstance(selected[0], dict) else None
+            auswahl_id = pd.to_numeric(pd.Series([auswahl_id]), errors="coerce").iloc[0]
+            sichtbar = pd.to_numeric(filtered_dp_df["Datenpunkt-ID"], errors="coerce")
+            if pd.isna(auswahl_id) or not (sichtbar == auswahl_id).any():
+                st.session_state.pop("dp_auswahl", None)
+                selected = []
+
+        if selected and st.button(" Auswahl aufheben"):
+            st.session_state.pop("dp_auswahl", None)
+            st.session_state["dp_grid_runde"] = st.session_state.get("dp_grid_runde", 0) + 1
+            st.rerun()
+
         if selected:
             selected_obj = selected[0]
             selected_dp_id = selected_obj.get("Datenpunkt-ID") if isinstance(selected_obj, dict) else None
@@ -96,16 +122,28 @@ def display_data_model(excel_file_path):
 
                 st.markdown(f"###  Zugehörige Kennzahlen zu Datenpunkt-ID `{selected_dp_id_str}`")
 
-                matching_kz = kennzahlen_df[
-                    kennzahlen_df["Datenpunkt-ID"].astype(str) == selected_dp_id_str
-                ]
+                matching_kz = kz_index.reihe(selected_dp_id)
 
                 if not matching_kz.empty:
+                    # Zeitraum und Verlauf über die geparsten Werte ("Zahl")
+                    jahre = pd.to_numeric(matching_kz["Jahr"], errors="coerce").dropna()
+                    if jahre.nunique() > 1:
+                        von, bis = st.slider(
+                            " Jahre", int(jahre.min()), int(jahre.max()), (int(jahre.min()), int(jahre.max())),
+                            key=f"kz_jahre_{selected_dp_id_str}"
+                        )
+                        matching_kz = kz_index.reihe(selected_dp_id, von=von, bis=bis)
+                    verlauf = matching_kz.dropna(subset=["Zahl", "Jahr"])
+                    if verlauf["Jahr"].nunique() > 1:
+                        st.line_chart(verlauf.pivot_table(index="Jahr", columns="Stakeholder-ID", values="Zahl", aggfunc="last"))
+                    kz_fenster, kz_ansicht = seitenfenster(matching_kz, "kz", such_index(store), "Kennzahl")
                     AgGrid(
-                        matching_kz,
+                        kz_fenster,
+                        gridOptions=grid_optionen(kz_fenster),
                         theme="streamlit",
                         fit_columns_on_grid_load=True,
-                        domLayout="autoHeight"
+                        domLayout="autoHeight",
+                        key=f"kz_grid_{hash((selected_dp_id_str,) + kz_ansicht)}"
                     )
                 else:
                     st.info(" Für diesen Datenpunkt sind keine Kennzahlen vorhanden.")
@@ -1,69 +1,124 @@
 import streamlit as st
 import pandas as pd
-from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode
+from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode, DataReturnMode
 import os
+from datenmodell import ConflictError, diff_cells, get_store, primary_key, same_value
+from suchindex import such_index
+from tabellenansicht import seitenfenster
 
 def edit_entity_and_save_to_model(excel_file_path):
     st.title(" Entitäten aus Datenmodell bearbeiten und speichern")
 
+    if "bearbeiten_meldung" in st.session_state:
+        st.success(st.session_state.pop("bearbeiten_meldung"))
+
     try:
         if not os.path.exists(excel_file_path):
             st.error(" Die Datei wurde nicht gefunden.")
             return
 
-        xls = pd.ExcelFile(excel_file_path)
-        tabellen = xls.sheet_names
+        store = get_store(excel_file_path)
+        tabellen = store.sheet_names()
         entitaeten = [name for name in tabellen if "-" not in name]
 
         selected_table = st.selectbox(" Entität auswählen", entitaeten)
 
-        df = xls.parse(selected_table).fillna("")
+        df = store.sheet(selected_table)
         df = df.loc[:, ~df.columns.str.contains("^Unnamed")]
 
         if df.empty:
             st.info(" Diese Entität enthält keine Daten.")
             return
 
-        #  Sucheingabe
-        search_term = st.text_input(" Suche in der Tabelle").strip().lower()
-        if search_term:
-            df = df[df.apply(lambda row: row.astype(str).str.lower().str.contains(search_term).any(), axis=1)]
+        keys = primary_key(selected_table, df)
+        if not keys:
+            st.error(" Diese Entität hat keine ID-Spalte, Änderungen können keiner Zeile zugeordnet werden.")
+            return
+
+        #  Ungespeicherte Änderungen je Entität: {(Schlüssel, Spalte): (gespeicherter Wert, neuer Wert)}
+        puffer = st.session_state.setdefault(f"aenderungen_{selected_table}", {})
+
+        #  Suche, Sortierung und Blättern; nur die sichtbare Seite geht an das Grid
+        fenster_df, ansicht = seitenfenster(df, f"bearbeiten_{selected_table}", such_index(store), selected_table)
+        gespeichert_df = fenster_df
+        fenster_df = fenster_df.copy()
+        zeile_von = {k: i for i, k in enumerate(zip(*(fenster_df[k] for k in keys)))}
+        for k, i in zeile_von.items():
+            for spalte in df.columns:
+                if (k, spalte) in puffer:
+                    if fenster_df[spalte].dtype != object:
+                        fenster_df[spalte] = fenster_df[spalte].astype(object)
+                    fenster_df.iat[i, fenster_df.columns.get_loc(spalte)] = puffer[(k, spalte)][1]
 
         #  AgGrid-Konfiguration
-        gb = GridOptionsBuilder.from_dataframe(df)
-        gb.configure_pagination()
-        gb.configure_default_column(editable=True, wrapText=True, autoHeight=True)
+        gb = GridOptionsBuilder.from_dataframe(fenster_df)
+        gb.configure_default_column(editable=True, wrapText=True, autoHeight=True, sortable=False, filter=False)
         gb.configure_grid_options(domLayout="autoHeight")
 
         #  Alle Spalten mit "ID" im Namen nicht bearbeitbar machen
-        id_spalten = [col for col in df.columns if "id" in col.lower()]
+        id_spalten = [col for col in fenster_df.columns if "id" in col.lower()]
         for id_col in id_spalten:
             gb.configure_column(id_col, editable=False)
 
         #  Spalte "Wert" explizit als Textspalte definieren (Text statt Zahl)
-        if "Wert" in df.columns:
+        if "Wert" in fenster_df.columns:
             gb.configure_column("Wert", type=["textColumn"], cellDataType="text", editable=True)
 
         grid_options = gb.build()
 
         #  Interaktive Tabelle siehe Projektarbeit Kap. 5
+        #  MANUAL: Änderungen bleiben im Browser, bis im Grid "Update" geklickt wird
         grid_response = AgGrid(
-            df,
+            fenster_df,
             gridOptions=grid_options,
-            update_mode=GridUpdateMode.VALUE_CHANGED,
+            update_mode=GridUpdateMode.MANUAL,
+            data_return_mode=DataReturnMode.AS_INPUT,
             fit_columns_on_grid_load=True,
-            theme="streamlit"
+            theme="streamlit",
+            key=f"bearbeiten_grid_{selected_table}_{hash(ansicht)}_{len(puffer)}"
         )
 
         edited_df = grid_response["data"]
-
-        if st.button(" Änderungen ins Datenmodell speichern"):
+        if isinstance(edited_df, pd.DataFrame) and len(edited_df) == len(fenster_df):
+            vorher = dict(puffer)
+            for k, spalte, _, wert in diff_cells(fenster_df, edited_df, keys):
+                gespeichert = gespeichert_df.iat[zeile_von[k], gespeichert_df.columns.get_loc(spalte)]
+                if same_value(gespeichert, wert):
+                    puffer.pop((k, spalte), None)
+                else:
+                    puffer[(k, spalte)] = (gespeichert, wert)
+            if puffer != vorher:
+                st.rerun()
+
+        if puffer:
+            with st.expander(f" {len(puffer)} ungespeicherte Änderung(en)"):
+                st.dataframe(pd.DataFrame(
+                    [(", ".join(map(str, k)), spalte, alt, wert) for (k, spalte), (alt, wert) in puffer.items()],
+                    columns=[" / ".join(keys), "Spalte", "Bisher", "Neu"]
+                ), hide_index=True)
+
+        col_speichern, col_verwerfen = st.columns(2)
+        if col_speichern.button(" Änderungen ins Datenmodell speichern", disabled=not puffer):
             try:
-                with pd.ExcelWriter(excel_file_path, engine="openpyxl", mode="a", if_sheet_exists="replace") as writer:
-                    edited_df.to_excel(writer, sheet_name=selected_table, index=False)
-                st.success(f" Änderungen in '{selected_table}' wurden erfolgreich gespeichert.")
+                # Nur die geänderten Zellen; jede wird gegen den gespeicherten Stand geprüft
+                with store.transaction() as tx:
+                    tx.update(selected_table, [(k, spalte, alt, wert) for (k, spalte), (alt, wert) in puffer.items()])
+                anzahl = len(puffer)
+                puffer.clear()
+                st.session_state["bearbeiten_meldung"] = f" {anzahl} Zelle(n) in '{selected_table}' wurden erfolgreich gespeichert."
+                st.rerun()
+            except ConflictError as e:
+                st.error(f" {e} Bitte die betroffenen Änderungen verwerfen und neu eingeben:")
+                st.dataframe(pd.DataFrame(
+                    [(", ".join(map(str, k)), spalte, alt, "(gelöscht)" if aktuell is None else aktuell)
+                     for k, spalte, alt, aktuell in e.konflikte],
+                    columns=[" / ".join(keys), "Spalte", "Erwartet", "Aktuell gespeichert"]
+                ), hide_index=True)
             except Exception as e:
                 st.error(f" Fehler beim Schreiben in die Datei: {e}")
+        if col_verwerfen.button(" Änderungen verwerfen", disabled=not puffer):
+            puffer.clear()
+            st.rerun()
 
     except Exception as e:
         st.error(f" Fehler beim Verarbeiten der Datei: {e}")
@@ -1,59 +1,94 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import os
+from datenmodell import get_store, loeschplan, loesche, primary_key
 
 def delete_entity_and_cascade(excel_file_path):
-    st.title(" Entitätseintrag löschen (inkl. verknüpfte Daten)")
+    st.title(" Einträge löschen (inkl. verknüpfte Daten)")
+
+    if "loeschen_meldung" in st.session_state:
+        st.success(st.session_state.pop("loeschen_meldung"))
 
     if not os.path.exists(excel_file_path):
         st.error(" Datei wurde nicht gefunden.")
         return
 
     try:
-        xls = pd.ExcelFile(excel_file_path)
-        tabellen = xls.sheet_names
+        store = get_store(excel_file_path)
+        tabellen = store.sheet_names()
         entitaeten = [name for name in tabellen if "-" not in name]
 
         selected_entity = st.selectbox(" Entität auswählen", entitaeten)
-        df_entity = xls.parse(selected_entity).fillna("")
-        df_entity = df_entity.loc[:, ~df_entity.columns.str.contains("^Unnamed")]
+        roh_df = store.sheet(selected_entity)
+        roh_df = roh_df.loc[:, ~roh_df.columns.str.contains("^Unnamed")]
+        df_entity = roh_df.fillna("")
 
         if df_entity.empty:
             st.info(" Keine Einträge in dieser Entität.")
             return
 
         # ID-Spalte identifizieren
-        id_spalten = [col for col in df_entity.columns if "id" in col.lower()]
-        id_col = next((c for c in id_spalten if c.lower().startswith(selected_entity.lower())), id_spalten[0])
-
-        # Auswahl per Anzeige einer Zeile (nicht ID-basiert, sondern optisch)
-        anzeige_spalte = next((c for c in df_entity.columns if c != id_col), df_entity.columns[0])
-        auswahl = st.selectbox("🔍 Eintrag auswählen", df_entity[anzeige_spalte])
-        zeile = df_entity[df_entity[anzeige_spalte] == auswahl]
-        if zeile.empty:
-            st.warning(" Kein gültiger Eintrag ausgewählt.")
+        keys = primary_key(selected_entity, df_entity)
+        if not keys:
+            st.error(" Diese Entität hat keine ID-Spalte.")
             return
+        id_col = keys[0]
 
-        ziel_id = zeile.iloc[0][id_col]
-
-        if st.button(f" '{auswahl}' löschen und alle zugehörigen Einträge entfernen"):
-            
-            writer = pd.ExcelWriter(excel_file_path, engine="openpyxl", mode="a", if_sheet_exists="replace")
+        #  Einzelne Einträge per Auswahl oder alle Einträge, die einem Filter entsprechen
+        modus = st.radio("Auswahl", ["Einzelne Einträge", "Nach Filter"], horizontal=True)
+        if modus == "Einzelne Einträge":
+            # Auswahl über die IDs, nicht über Zeilenpositionen: andere Sitzungen können
+            # zwischen Auswahl und Klick Zeilen einfügen oder löschen
+            anzeige_spalte = next((c for c in df_entity.columns if c != id_col), df_entity.columns[0])
+            ids = roh_df[id_col]
+            anzeige = dict(zip(ids.tolist(), df_entity[anzeige_spalte].astype(str).tolist()))
+            auswahl = st.multiselect(
+                "🔍 Einträge auswählen",
+                options=list(dict.fromkeys(ids.dropna().tolist())),
+                format_func=lambda i: f"{anzeige[i]} ({id_col} {i})",
+                key=f"loeschen_auswahl_{selected_entity}"
+            )
+            positionen = np.flatnonzero(ids.isin(auswahl).to_numpy())
+        else:
+            filter_spalte = st.selectbox("Filtern nach Spalte", [c for c in df_entity.columns if c != id_col] or [id_col])
+            werte = roh_df[filter_spalte]
+            zahlen = pd.to_numeric(werte, errors="coerce")
+            if zahlen.notna().any() and zahlen.notna().sum() == werte.notna().sum():
+                # Zahlenspalte (z. B. Jahr): Vergleich mit einem Grenzwert
+                col_bedingung, col_wert = st.columns(2)
+                bedingung = col_bedingung.selectbox("Bedingung", ["<", "<=", "=", ">=", ">"])
+                ganzzahlig = bool((zahlen.dropna() % 1 == 0).all())
+                start = int(zahlen.min()) if ganzzahlig else float(zahlen.min())
+                grenze = col_wert.number_input("Wert", value=start)
+                treffer = {
+                    "<": zahlen < grenze, "<=": zahlen <= grenze, "=": zahlen == grenze,
+                    ">=": zahlen >= grenze, ">": zahlen > grenze
+                }[bedingung]
+            else:
+                gewaehlt = st.multiselect("Werte", sorted(werte.dropna().astype(str).unique()))
+                treffer = werte.notna() & werte.astype(str).isin(gewaehlt)
+            positionen = np.flatnonzero(treffer.to_numpy())
+            st.caption(f"{len(positionen)} von {len(df_entity)} Einträgen entsprechen dem Filter.")
 
-            for sheet in tabellen:
-                try:
-                    sheet_df = pd.read_excel(excel_file_path, sheet_name=sheet)
+        if not len(positionen):
+            st.info(" Bitte mindestens einen Eintrag auswählen.")
+            return
 
-                    # Wenn die ID-Spalte vorhanden ist → filtern
-                    if id_col in sheet_df.columns:
-                        sheet_df = sheet_df[sheet_df[id_col] != ziel_id]
-                    writer.book.remove(writer.book[sheet])  
-                    sheet_df.to_excel(writer, sheet_name=sheet, index=False)
-                except Exception as inner:
-                    pass  
+        # Alle abhängigen Einträge über die Fremdschlüssel ermitteln und vorab anzeigen
+        plan = loeschplan(store, {selected_entity: positionen})
+        st.markdown("#### Vorschau")
+        st.dataframe(
+            pd.DataFrame({"Tabelle": list(plan), "Zu löschende Zeilen": [len(p) for p in plan.values()]}),
+            hide_index=True
+        )
 
-            writer.close()
-            st.success(f" Eintrag '{auswahl}' und alle verknüpften Daten mit `{id_col} = {ziel_id}` wurden entfernt.")
+        if st.button(f" {len(positionen)} Einträge löschen und alle zugehörigen Einträge entfernen"):
+            # Ganze Auswahl samt Abhängigen in einem Schreibvorgang, nur betroffene Sheets ändern sich
+            loesche(store, plan)
+            verknuepft = sum(len(p) for p in plan.values()) - len(positionen)
+            st.session_state["loeschen_meldung"] = f" {len(positionen)} Einträge aus '{selected_entity}' und {verknuepft} verknüpfte Einträge wurden entfernt."
+            st.rerun()
     except PermissionError:
                 st.error(" Zugriff verweigert: Die Datei ist derzeit geöffnet. Bitte schließe sie in Excel und versuche es erneut.")
     except Exception as e:
@@ -0,0 +1,38 @@
+import streamlit as st
+import os
+from datenmodell import get_store
+from suchindex import such_index
+
+# Treffer je Sheet, die direkt angezeigt werden
+TREFFER_JE_SHEET = 20
+
+def suche_anzeigen(excel_file_path):
+    st.title(" Suche im Datenmodell")
+    st.write("Durchsucht alle Tabellen auf einmal. Mehrere Wörter müssen alle in derselben Zeile vorkommen.")
+
+    if not os.path.exists(excel_file_path):
+        st.error(" Datei wurde nicht gefunden.")
+        return
+
+    try:
+        store = get_store(excel_file_path)
+        text = st.text_input(" Suchbegriff(e)")
+        if not text.strip():
+            return
+
+        ergebnisse = such_index(store).suche(text, limit=TREFFER_JE_SHEET)
+        if not ergebnisse:
+            st.info(" Keine Treffer.")
+            return
+
+        st.caption(" | ".join(f"{sheet}: {anzahl}" for sheet, anzahl, _ in ergebnisse))
+        for sheet, anzahl, treffer_df in ergebnisse:
+            with st.expander(f"{sheet} ({anzahl} Treffer)", expanded=len(ergebnisse) == 1):
+                treffer_df = treffer_df.loc[:, ~treffer_df.columns.astype(str).str.startswith("Unnamed")]
+                st.dataframe(treffer_df.fillna(""), use_container_width=True, hide_index=True)
+                if anzahl > TREFFER_JE_SHEET:
+                    st.caption(f"Die {TREFFER_JE_SHEET} besten von {anzahl} Treffern; Suche verfeinern für mehr.")
+    except Exception as e:
+        st.error(f" Fehler: {e}")
+
+suche_anzeigen("/Matching/Datenmodell.xlsx")
\ No newline at end of file
@@ -0,0 +1,153 @@
+"""Volltextsuche über alle Sheets des Datenmodells.
+
+Je Sheet (und optional je Spaltenauswahl) wird ein Trigramm-Index über den
+kleingeschriebenen Zelltexten aufgebaut. Eine Suche schneidet die Trefferlisten
+der Trigramme des Suchbegriffs und prüft nur die verbleibenden Zeilen auf den
+Teilstring, die Semantik bleibt also "enthält, ohne Groß-/Kleinschreibung".
+Neu gebaut wird ein Index nur, wenn sich die Version seines Sheets im Store
+geändert hat.
+"""
+import re
+import threading
+import weakref
+from collections import defaultdict
+
+import numpy as np
+
+N = 3
+
+# Trennt die Zellen einer Zeile; kommt in Suchbegriffen nicht vor, Treffer reichen also nie über Zellgrenzen
+TRENNER = "\x1f"
+
+_LEER = np.array([], dtype=np.int32)
+
+
+def _zeilentexte(df, spalten):
+    if not spalten:
+        return [""] * len(df)
+    teile = [df[c].astype(object).where(df[c].notna(), "").astype(str).str.lower() for c in spalten]
+    text = teile[0]
+    for teil in teile[1:]:
+        text = text + TRENNER + teil
+    return text.tolist()
+
+
+def _trigramme(text):
+    return {text[i:i + N] for i in range(len(text) - N + 1)}
+
+
+class TextIndex:
+    def __init__(self, texte, labels):
+        self.texte = texte
+        self.labels = labels
+        postings = defaultdict(list)
+        for pos, text in enumerate(texte):
+            for gramm in _trigramme(text):
+                if TRENNER not in gramm:
+                    postings[gramm].append(pos)
+        self._postings = {gramm: np.array(p, dtype=np.int32) for gramm, p in postings.items()}
+
+    def positionen(self, begriff):
+        begriff = begriff.lower()
+        if not begriff:
+            return np.arange(len(self.texte))
+        if len(begriff) < N:
+            # Zu kurz für Trigramme: über die vorbereiteten Texte, ohne DataFrame-Zugriffe
+            return np.array([i for i, text in enumerate(self.texte) if begriff in text], dtype=np.int64)
+        listen = sorted((self._postings.get(g, _LEER) for g in _trigramme(begriff)), key=len)
+        kandidaten = listen[0]
+        for liste in listen[1:]:
+            if not len(kandidaten):
+                break
+            kandidaten = np.intersect1d(kandidaten, liste, assume_unique=True)
+        # Trigramme können in falscher Reihenfolge vorkommen: Teilstring bestätigen
+        return np.array([i for i in kandidaten if begriff in self.texte[i]], dtype=np.int64)
+
+    def treffer(self, begriff):
+        return self.labels[self.positionen(begriff)]
+
+    def bewerte(self, begriffe):
+        """Zeilen, die alle Begriffe enthalten, mit Punktzahl; beste zuerst.
+
+        Je Begriff: 1 Punkt für einen Treffer, 2 mehr am Wortanfang, 3 mehr wenn
+        eine Zelle genau dem Begriff entspricht.
+        """
+        begriffe = [b.lower() for b in begriffe if b]
+        if not begriffe:
+            return []
+        kandidaten = self.positionen(begriffe[0])
+        for begriff in begriffe[1:]:
+            kandidaten = np.intersect1d(kandidaten, self.positionen(begriff), assume_unique=True)
+        wortanfang = [re.compile(r"(?:^|[\s\x1f\-/(.,;:])" + re.escape(b)) for b in begriffe]
+        ergebnis = []
+        for pos in kandidaten:
+            text = self.texte[pos]
+            zellen = TRENNER + text + TRENNER
+            punkte = 0
+            for begriff, muster in zip(begriffe, wortanfang):
+                punkte += 1
+                if muster.search(text):
+                    punkte += 2
+                if TRENNER + begriff + TRENNER in zellen:
+                    punkte += 3
+            ergebnis.append((punkte, len(text), int(pos)))
+        ergebnis.sort(key=lambda e: (-e[0], e[1]))
+        return [(pos, punkte) for punkte, _, pos in ergebnis]
+
+
+class SuchIndex:
+    def __init__(self, store):
+        self.store = store
+        self._indizes = {}
+        self._lock = threading.Lock()
+
+    def index(self, sheet, spalten=None):
+        version, df = self.store.sheet_readonly(sheet)
+        key = (sheet, tuple(spalten) if spalten else None)
+        with self._lock:
+            eintrag = self._indizes.get(key)
+            if eintrag and eintrag[0] == version:
+                return eintrag[1]
+            auswahl = [c for c in (spalten or df.columns) if c in df.columns and not str(c).startswith("Unnamed")]
+            index = TextIndex(_zeilentexte(df, auswahl), df.index)
+            self._indizes[key] = (version, index)
+            return index
+
+    def filter(self, df, sheet, begriff, spalten=None):
+        """Zeilen von df (Kopie oder Teilmenge des Sheets), die begriff enthalten."""
+        if not begriff:
+            return df
+        return df[df.index.isin(self.index(sheet, spalten).treffer(begriff))]
+
+    def suche(self, text, sheets=None, limit=20):
+        """Sucht alle Wörter aus text in allen Sheets.
+
+        Gibt je Sheet mit Treffern (Sheet, Anzahl, DataFrame der besten limit Zeilen
+        mit Spalte "Relevanz") zurück, Sheets mit den besten Treffern zuerst.
+        """
+        begriffe = text.split()
+        ergebnisse = []
+        for sheet in sheets or self.store.sheet_names():
+            bewertung = self.index(sheet).bewerte(begriffe)
+            if not bewertung:
+                continue
+            _, df = self.store.sheet_readonly(sheet)
+            beste = bewertung[:limit]
+            treffer_df = df.iloc[[pos for pos, _ in beste]].copy()
+            treffer_df.insert(0, "Relevanz", [punkte for _, punkte in beste])
+            ergebnisse.append((sheet, len(bewertung), treffer_df))
+        ergebnisse.sort(key=lambda e: -e[2]["Relevanz"].iloc[0])
+        return ergebnisse
+
+
+_indizes = weakref.WeakKeyDictionary()
+_indizes_lock = threading.Lock()
+
+
+def such_index(store):
+    """Ein Suchindex je Store, geteilt von allen Seiten und Sessions."""
+    with _indizes_lock:
+        index = _indizes.get(store)
+        if index is None:
+            index = _indizes[store] = SuchIndex(store)
+        return index
\ No newline at end of file
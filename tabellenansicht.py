@@ -0,0 +1,51 @@
+"""Gemeinsame Tabellenansicht: Suche, Sortierung und Blättern in pandas.
+
+An ein Grid wird immer nur die sichtbare Seite übergeben, damit Antwortzeit und
+Browser-Speicher nicht mit der Größe der Tabelle wachsen.
+"""
+import math
+
+import pandas as pd
+import streamlit as st
+
+SEITENGROESSEN = [25, 50, 100, 250]
+
+
+def sortiere(df, spalte, absteigend):
+    try:
+        return df.sort_values(spalte, ascending=not absteigend, na_position="last", kind="stable")
+    except TypeError:
+        # Gemischte Typen (z. B. Zahlen und Text) als Text vergleichen
+        return df.sort_values(spalte, ascending=not absteigend, na_position="last", kind="stable",
+                              key=lambda s: s.astype(str))
+
+
+def seitenfenster(df, key, suchindex=None, sheet=None):
+    """Gibt die sichtbare Seite (NaN als "") und den Zustand der Ansicht zurück.
+
+    Ist df (eine Teilmenge von) Sheet sheet, sucht die Suche über suchindex statt
+    alle Spalten bei jedem Rerun zu durchlaufen.
+    """
+    col_suche, col_sort, col_richtung, col_groesse = st.columns([3, 2, 1, 1])
+    suche = col_suche.text_input(" Suche in allen Spalten", key=f"{key}_suche")
+    sortierung = col_sort.selectbox("Sortieren nach", ["(keine)"] + list(df.columns), key=f"{key}_sortierung")
+    absteigend = col_richtung.checkbox("Absteigend", key=f"{key}_absteigend")
+    groesse = col_groesse.selectbox("Zeilen pro Seite", SEITENGROESSEN, key=f"{key}_groesse")
+
+    if suche and suchindex is not None and sheet:
+        df = suchindex.filter(df, sheet, suche)
+    elif suche:
+        treffer = pd.Series(False, index=df.index)
+        for spalte in df.columns:
+            treffer |= df[spalte].astype(str).str.contains(suche, case=False, regex=False, na=False)
+        df = df[treffer]
+    if sortierung != "(keine)":
+        df = sortiere(df, sortierung, absteigend)
+
+    gesamt = len(df)
+    seiten = max(1, math.ceil(gesamt / groesse))
+    seite = st.number_input(f"Seite (von {seiten})", min_value=1, max_value=seiten, value=1, step=1, key=f"{key}_seite_{seiten}")
+    start = (seite - 1) * groesse
+    fenster = df.iloc[start:start + groesse]
+    st.caption(f"Zeilen {start + 1 if gesamt else 0}–{start + len(fenster)} von {gesamt}")
+    return fenster.fillna(""), (suche, sortierung, absteigend, groesse, seite)
\ No newline at end of file
@@ -0,0 +1,40 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+import datenmodell as dm
+
+MODELL = os.path.join(os.path.dirname(__file__), "..", "Matching", "Datenmodell.xlsx")
+
+
+@pytest.fixture
+def pfad(tmp_path):
+    ziel = tmp_path / "Datenmodell.xlsx"
+    shutil.copy(MODELL, ziel)
+    return str(ziel)
+
+
+def _mit_ids(frames, ids):
+    frames = dict(frames)
+    regelwerk = frames["Regelwerk"]
+    neu = pd.DataFrame({"Regelwerk-ID": ids, "Name": [f"Import {i}" for i in ids]})
+    frames["Regelwerk"] = pd.concat([regelwerk, neu], ignore_index=True)
+    return frames
+
+
+def test_reservierung_nach_import_sqlite(pfad):
+    store = dm.ModelStore(dm.SqliteBackend(dm.sqlite_pfad(pfad), excel_pfad=pfad))
+    store.reserviere_ids("Regelwerk")
+    dm.schreibe_workbook(pfad, _mit_ids(pd.read_excel(pfad, sheet_name=None), [10, 11]))
+    store.import_excel(pfad)
+    assert store.reserviere_ids("Regelwerk") == 12
+
+
+def test_reservierung_nach_replace_excel(pfad):
+    store = dm.ModelStore(dm.ExcelBackend(pfad))
+    store.reserviere_ids("Regelwerk")
+    with store.transaction() as tx:
+        tx.replace("Regelwerk", _mit_ids(store.load(), [10, 11])["Regelwerk"])
+    assert store.reserviere_ids("Regelwerk") == 12
\ No newline at end of file
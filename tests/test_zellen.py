@@ -0,0 +1,37 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+import datenmodell as dm
+
+MODELL = os.path.join(os.path.dirname(__file__), "..", "Matching", "Datenmodell.xlsx")
+
+
+@pytest.fixture
+def store(tmp_path):
+    ziel = tmp_path / "Datenmodell.xlsx"
+    shutil.copy(MODELL, ziel)
+    store = dm.ModelStore(dm.ExcelBackend(str(ziel)))
+    kennzahl = pd.DataFrame({"Kennzahl-ID": [1, 2], "Datenpunkt-ID": [1, 1], "Wert": [12.5, 3.0],
+                             "Jahr": [2023, 2024], "Quelle": ["", ""], "Stakeholder-ID": [1, 1]})
+    with store.transaction() as tx:
+        tx.replace("Kennzahl", kennzahl)
+    return store
+
+
+def test_wert_bleibt_text(store):
+    with store.transaction() as tx:
+        tx.update("Kennzahl", [((1,), "Wert", 12.5, "3,5 Mio. €"), ((2,), "Wert", 3.0, "12,5")])
+    werte = store.load()["Kennzahl"].set_index("Kennzahl-ID")["Wert"]
+    assert werte[1] == "3,5 Mio. €"
+    assert werte[2] == "12,5"
+
+
+def test_schluessel_und_jahr_als_zahl(store):
+    with store.transaction() as tx:
+        tx.update("Kennzahl", [((1,), "Jahr", 2023, "2025"), ((1,), "Datenpunkt-ID", 1, " 2 ")])
+    zeile = store.load()["Kennzahl"].set_index("Kennzahl-ID").loc[1]
+    assert zeile["Jahr"] == 2025
+    assert zeile["Datenpunkt-ID"] == 2
\ No newline at end of file
@@ -0,0 +1,76 @@
+"""Lädt Datenmodell, Matching-Regeln und Masken beim Start im Hintergrund vor.
+
+Geladen wird in dieselben prozessweiten Caches, die auch die Seiten verwenden
+(get_store, load_rules, masken_index). Diese sind jeweils per Lock geschützt:
+öffnet man eine Seite, bevor das Vorladen fertig ist, wartet sie auf den
+laufenden Ladevorgang, statt die Datei ein zweites Mal zu lesen.
+"""
+import threading
+import time
+
+from datenmodell import DATA_FILE, get_store
+from extraktion import masken_index
+from matching import MATCHING_DATEI, load_rules
+
+WARTET = "wartet"
+LAEUFT = "lädt"
+FERTIG = "fertig"
+FEHLER = "Fehler"
+OHNE_THREADS = "wird beim ersten Öffnen geladen"
+
+# Reihenfolge wie auf der Startseite angezeigt
+AUFGABEN = [
+    ("Datenmodell", lambda: get_store(DATA_FILE).sheet_names()),
+    ("Matching-Regeln", lambda: load_rules(MATCHING_DATEI)),
+    ("Masken", masken_index),
+]
+
+
+class Vorladen:
+    def __init__(self):
+        self.zustand = {name: (WARTET, None) for name, _ in AUFGABEN}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _setze(self, name, status, info=None):
+        with self._lock:
+            self.zustand[name] = (status, info)
+
+    def _lauf(self):
+        for name, laden in AUFGABEN:
+            self._setze(name, LAEUFT)
+            start = time.perf_counter()
+            try:
+                laden()
+            except Exception as e:
+                self._setze(name, FEHLER, str(e))
+            else:
+                self._setze(name, FERTIG, time.perf_counter() - start)
+
+    def starte(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._lauf, name="vorladen", daemon=True)
+        try:
+            self._thread.start()
+        except RuntimeError:
+            # Ohne Threads (stlite/Pyodide) laden die Seiten wie bisher selbst
+            for name, _ in AUFGABEN:
+                self._setze(name, OHNE_THREADS)
+
+    def uebersicht(self):
+        with self._lock:
+            return dict(self.zustand)
+
+    def laeuft(self):
+        return any(status in (WARTET, LAEUFT) for status, _ in self.uebersicht().values())
+
+
+_vorladen = Vorladen()
+
+
+def starte():
+    """Startet das Vorladen einmal pro Prozess; weitere Aufrufe liefern nur den Zustand."""
+    _vorladen.starte()
+    return _vorladen
\ No newline at end of file